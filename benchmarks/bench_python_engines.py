@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark PythonParser's astroid engine against the stdlib ast engine.
+
+Runs both engines over the given Python files (or a generated sample file),
+checks that they produce identical results and reports the timings.
+
+Usage:
+    python benchmarks/bench_python_engines.py [--repeat N] [file_or_dir ...]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pycodelens.python_parser import PythonParser
+from pycodelens.scanner import iter_source_files
+
+
+def generate_sample(num_classes=200):
+    """Generate a Python module with decorated functions and nested classes."""
+    parts = ['import functools\n\n']
+    for i in range(num_classes):
+        parts.append(
+            f"@functools.lru_cache(maxsize=None)\n"
+            f"def helper_{i}(value):\n"
+            f"    print('helper', value)\n"
+            f"    return value * {i}\n\n"
+            f"class Widget{i}:\n"
+            f"    class Meta:\n"
+            f"        def describe(self):\n"
+            f"            return {{'id': {i}}}\n\n"
+            f"    @property\n"
+            f"    def size(self):\n"
+            f"        def inner():\n"
+            f"            print(self, {i})\n"
+            f"        return inner\n\n"
+            f"    @staticmethod\n"
+            f"    def build(*args, **kwargs):\n"
+            f"        print(*args)\n"
+            f"        return Widget{i}()\n\n"
+        )
+    return ''.join(parts)
+
+
+def time_engine(file_path, engine, repeat):
+    """Return (best time in seconds, results) for one engine on one file."""
+    best = None
+    results = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = PythonParser(file_path, engine).extract_elements()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the astroid and ast Python engines')
+    parser.add_argument('paths', nargs='*', help='Python files or directories (default: generated sample)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per file; the best time is kept')
+    args = parser.parse_args()
+
+    temp_path = None
+    if args.paths:
+        files = [f for path in args.paths for f in iter_source_files(path) if f.endswith('.py')]
+    else:
+        fd, temp_path = tempfile.mkstemp(suffix='.py')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(generate_sample())
+        files = [temp_path]
+
+    totals = {'astroid': 0.0, 'ast': 0.0}
+    mismatches = []
+    try:
+        for file_path in files:
+            try:
+                astroid_time, astroid_results = time_engine(file_path, 'astroid', args.repeat)
+                ast_time, ast_results = time_engine(file_path, 'ast', args.repeat)
+            except (SyntaxError, ValueError, UnicodeDecodeError) as e:
+                print(f"Skipping {file_path}: {e}", file=sys.stderr)
+                continue
+            totals['astroid'] += astroid_time
+            totals['ast'] += ast_time
+            if astroid_results != ast_results:
+                mismatches.append(file_path)
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+    print(f"Files:   {len(files)}")
+    print(f"astroid: {totals['astroid']:.3f}s")
+    print(f"ast:     {totals['ast']:.3f}s")
+    if totals['ast']:
+        print(f"Speedup: {totals['astroid'] / totals['ast']:.1f}x")
+    if mismatches:
+        print(f"Results differ for {len(mismatches)} file(s):")
+        for file_path in mismatches:
+            print(f"  {file_path}")
+        return 1
+    print("Results identical")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark the start-up cost of the pycodelens CLI.
+
+Runs `python -m pycodelens FILE --counts` on a small Python, JavaScript and
+TypeScript file in fresh interpreters and reports the best wall time, the
+import time measured with `python -X importtime`, the number of modules
+imported and whether astroid was loaded. Results can be saved as a JSON
+baseline and later runs compared against it; the script exits with status 1
+if any case regressed.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat N] [--top N]
+        [--save-baseline FILE] [--baseline FILE] [--threshold FRACTION]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+SAMPLES = {
+    'py': "import os\n\n\n@decorator\ndef main():\n    print(os.getcwd())\n\n\nclass Widget:\n    def run(self):\n        pass\n",
+    'js': "function main() {\n  return 1;\n}\n\nclass Widget {\n  run() {}\n}\n",
+    'ts': "interface Options {\n  name: string;\n}\n\nfunction main(): number {\n  return 1;\n}\n",
+}
+
+# (case name, sample language, extra CLI arguments)
+CASES = [
+    ('python[astroid]', 'py', []),
+    ('python[ast]', 'py', ['--engine', 'ast']),
+    ('javascript', 'js', []),
+    ('typescript', 'ts', []),
+]
+
+
+def cli_command(file_path, extra_args, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    return command + ['-m', 'pycodelens', file_path, '--counts'] + extra_args
+
+
+def run_env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.abspath(REPO_ROOT) + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        List of (module, self microseconds, cumulative microseconds, depth),
+        with depth 0 for imports not nested in another import
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One space follows the separator, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def measure(file_path, extra_args, repeat):
+    """Run one case; wall and import times are the best of `repeat` runs each."""
+    env = run_env()
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cli_command(file_path, extra_args), env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    best_imports = None
+    for _ in range(repeat):
+        completed = subprocess.run(cli_command(file_path, extra_args, importtime=True), env=env,
+                                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        imports = parse_importtime(completed.stderr)
+        total = sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+        if best_imports is None or total < best_imports[0]:
+            best_imports = (total, imports)
+
+    total, imports = best_imports
+    return {
+        'seconds': best,
+        'import_seconds': total / 1e6,
+        'modules': len(imports),
+        'astroid_imported': any(name == 'astroid' for name, _, _, _ in imports),
+        'top_imports': sorted(((name, cumulative) for name, _, cumulative, depth in imports if depth == 0),
+                              key=lambda item: item[1], reverse=True),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages for cases slower than the baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        for metric in ('seconds', 'import_seconds'):
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                change = result[metric] / base[metric] - 1
+                regressions.append(f"{key}: {metric} {base[metric]:.4f} -> {result[metric]:.4f} (+{change:.0%})")
+        if result['astroid_imported'] and not base['astroid_imported']:
+            regressions.append(f"{key}: astroid is now imported")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pycodelens CLI start-up time')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case; the best is kept')
+    parser.add_argument('--top', type=int, default=5, help='Slowest top-level imports to list per case')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON to compare against, if it exists (default: %(default)s)')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Write the results as a new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown as a fraction (default: %(default)s)')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='pycodelens-startup-') as temp_dir:
+        for name, language, extra_args in CASES:
+            file_path = os.path.join(temp_dir, f'sample.{language}')
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(SAMPLES[language])
+            result = measure(file_path, extra_args, args.repeat)
+            results[name] = result
+            print(f"{name:<16} {result['seconds'] * 1000:>7.1f} ms wall, "
+                  f"{result['import_seconds'] * 1000:>7.1f} ms importing {result['modules']} modules"
+                  f"{', astroid loaded' if result['astroid_imported'] else ''}")
+            for module, cumulative in result['top_imports'][:args.top]:
+                print(f"    {module:<40} {cumulative / 1000:>7.1f} ms")
+            result['top_imports'] = result['top_imports'][:args.top]
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the PyCodeLens parsers and file operations.
+
+Generates deterministic synthetic Python, JavaScript and TypeScript inputs
+(deeply nested, decorator-heavy) at several sizes, and measures the wall time,
+peak traced memory and elements per second of each parser, analyze_file and
+replace_element. Results can be saved as a JSON baseline and later runs
+compared against it; the script exits with status 1 if any case regressed.
+
+Timings only compare on the machine that recorded them, so no baseline is
+shipped: record one with --save-baseline first. Without a baseline nothing is
+compared and the script says so, exiting with status 0, or with status 2
+when --require-baseline is given (for CI).
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1k,10k,100k] [--repeat N]
+        [--only SUBSTRING] [--save-baseline FILE] [--baseline FILE]
+        [--require-baseline] [--threshold FRACTION] [--json-out FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pycodelens import __version__
+from pycodelens.analyzer import analyze_file, iter_elements, replace_element
+from pycodelens.javascript_parser import JavaScriptParser, TypeScriptParser
+from pycodelens.python_parser import PythonParser
+
+DEFAULT_SIZES = '1k,10k,100k'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def parse_size(text):
+    """Parse a line count such as '500', '10k' or '1m'."""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1:], 1)
+    return int(text.rstrip('km')) * multiplier
+
+
+def size_label(lines):
+    if lines % 1000000 == 0:
+        return f'{lines // 1000000}m'
+    if lines % 1000 == 0:
+        return f'{lines // 1000}k'
+    return str(lines)
+
+
+def python_block(i):
+    """One chunk of Python source: decorated functions and four levels of nested classes."""
+    return (
+        f"@functools.lru_cache(maxsize=None)\n"
+        f"@register('helper_{i}')\n"
+        f"def helper_{i}(value, *args, **kwargs):\n"
+        f"    def inner(x):\n"
+        f"        def innermost(y):\n"
+        f"            print('innermost', y)\n"
+        f"            return {{'value': y, 'items': [y, x, {i}]}}\n"
+        f"        return innermost(x)\n"
+        f"    print('helper', value, {i})\n"
+        f"    return inner(value)\n"
+        f"\n"
+        f"\n"
+        f"@dataclasses.dataclass\n"
+        f"class Outer{i}(Base):\n"
+        f"    class Middle:\n"
+        f"        class Inner:\n"
+        f"            class Core:\n"
+        f"                @staticmethod\n"
+        f"                def build():\n"
+        f"                    return Outer{i}()\n"
+        f"\n"
+        f"            @property\n"
+        f"            def size(self):\n"
+        f"                return {i}\n"
+        f"\n"
+        f"        @classmethod\n"
+        f"        @register('middle_{i}')\n"
+        f"        def create(cls, *args):\n"
+        f"            print(*args)\n"
+        f"            return cls()\n"
+        f"\n"
+        f"    def run(self, value):\n"
+        f"        if value:\n"
+        f"            for item in range(value):\n"
+        f"                print(item)\n"
+        f"        return value\n"
+        f"\n"
+        f"\n"
+    )
+
+
+def javascript_block(i):
+    """One chunk of JavaScript source: nested functions and classes."""
+    return (
+        f"function helper{i}(value) {{\n"
+        f"  function inner(x) {{\n"
+        f"    function innermost(y) {{\n"
+        f"      const text = `item ${{y}} {{ {i} }}`;\n"
+        f"      return {{ value: y, text: text, re: /[{{}}]+/g }};\n"
+        f"    }}\n"
+        f"    return innermost(x);\n"
+        f"  }}\n"
+        f"  // closing brace in a comment: }}\n"
+        f"  return inner(value);\n"
+        f"}}\n"
+        f"\n"
+        f"class Widget{i} extends Base {{\n"
+        f"  constructor(options) {{\n"
+        f"    super(options);\n"
+        f"    this.items = [];\n"
+        f"  }}\n"
+        f"\n"
+        f"  render() {{\n"
+        f"    for (const item of this.items) {{\n"
+        f"      if (item) {{\n"
+        f"        console.log('{{', item);\n"
+        f"      }}\n"
+        f"    }}\n"
+        f"    return {i};\n"
+        f"  }}\n"
+        f"}}\n"
+        f"\n"
+    )
+
+
+def typescript_block(i):
+    """One chunk of TypeScript source: interfaces, typed functions and classes."""
+    return (
+        f"interface Options{i} {{\n"
+        f"  name: string;\n"
+        f"  nested: {{ depth: number; tags: string[] }};\n"
+        f"}}\n"
+        f"\n"
+        f"function helper{i}(value: number): Options{i} {{\n"
+        f"  function inner(x: number): number {{\n"
+        f"    return x * {i};\n"
+        f"  }}\n"
+        f"  return {{ name: `h${{inner(value)}}`, nested: {{ depth: {i}, tags: [] }} }};\n"
+        f"}}\n"
+        f"\n"
+        f"class Service{i} extends Base {{\n"
+        f"  private readonly options: Options{i};\n"
+        f"\n"
+        f"  constructor(options: Options{i}) {{\n"
+        f"    super();\n"
+        f"    this.options = options;\n"
+        f"  }}\n"
+        f"\n"
+        f"  run(): void {{\n"
+        f"    if (this.options) {{\n"
+        f"      console.log(this.options.name);\n"
+        f"    }}\n"
+        f"  }}\n"
+        f"}}\n"
+        f"\n"
+    )
+
+
+LANGUAGES = {
+    'py': ('import functools\nimport dataclasses\n\n\n', python_block),
+    'js': ('', javascript_block),
+    'ts': ('', typescript_block),
+}
+
+
+def generate_source(language, num_lines):
+    """Generate a deterministic source file of a language with about num_lines lines."""
+    header, block = LANGUAGES[language]
+    parts = [header]
+    lines = header.count('\n')
+    i = 0
+    while lines < num_lines:
+        text = block(i)
+        parts.append(text)
+        lines += text.count('\n')
+        i += 1
+    return ''.join(parts)
+
+
+def count_elements(results):
+    return sum(1 for _ in iter_elements(results))
+
+
+def run_parser(parser_class, **kwargs):
+    def run(file_path):
+        return count_elements(parser_class(file_path, **kwargs).extract_elements())
+    return run
+
+
+def run_analyze_file(file_path):
+    return count_elements(analyze_file(file_path)['raw_results'])
+
+
+def run_replace_element(file_path):
+    """Replace a method in the middle of the file, like an editor integration would."""
+    success, message = replace_element(file_path, 'function', 'run',
+                                       replacement_content='def run(self, value):\n    return value\n')
+    if not success:
+        raise RuntimeError(message)
+    return 1
+
+
+# (case name, language, function of a file path returning the number of elements)
+CASES = [
+    ('PythonParser[astroid]', 'py', run_parser(PythonParser, engine='astroid')),
+    ('PythonParser[ast]', 'py', run_parser(PythonParser, engine='ast')),
+    ('JavaScriptParser', 'js', run_parser(JavaScriptParser)),
+    ('TypeScriptParser', 'ts', run_parser(TypeScriptParser)),
+    ('analyze_file[py]', 'py', run_analyze_file),
+    ('analyze_file[js]', 'js', run_analyze_file),
+    ('analyze_file[ts]', 'ts', run_analyze_file),
+    ('replace_element[py]', 'py', run_replace_element),
+]
+
+
+def measure(func, source_path, work_path, repeat):
+    """
+    Time a case on a fresh copy of its input file.
+
+    Returns:
+        Dictionary with the best wall time, the peak memory traced during
+        one extra run and the number of elements processed
+    """
+    best = None
+    elements = 0
+    for _ in range(repeat):
+        shutil.copyfile(source_path, work_path)
+        start = time.perf_counter()
+        elements = func(work_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Memory is measured separately because tracing slows the run down
+    shutil.copyfile(source_path, work_path)
+    tracemalloc.start()
+    try:
+        func(work_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': best,
+        'peak_bytes': peak,
+        'elements': elements,
+        'elements_per_second': elements / best if best else 0.0,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Return a list of regression messages for cases slower or bigger than the baseline allows."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if base[metric] and result[metric] > base[metric] * (1 + threshold):
+                change = result[metric] / base[metric] - 1
+                regressions.append(f"{key}: {metric} {base[metric]:.4g} -> {result[metric]:.4g} (+{change:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the PyCodeLens parsers and file operations')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='Comma-separated input sizes in lines (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case; the best is kept')
+    parser.add_argument('--only', help='Run only cases whose name contains this text')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON to compare against, if it exists (default: %(default)s)')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='Fail with exit status 2 if the baseline does not exist')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Write the results as a new baseline')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown or memory growth as a fraction (default: %(default)s)')
+    parser.add_argument('--json-out', metavar='FILE', help='Also write the results as JSON')
+    args = parser.parse_args()
+    if args.require_baseline and not args.save_baseline and not os.path.exists(args.baseline):
+        # Fail before spending minutes on a run that cannot be checked
+        print(f"No baseline at {args.baseline}; record one on this machine with "
+              f"--save-baseline {args.baseline}", file=sys.stderr)
+        return 2
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    cases = [case for case in CASES if not args.only or args.only in case[0]]
+
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix='pycodelens-bench-')
+    try:
+        print(f"{'case':<32} {'time (s)':>10} {'peak MB':>10} {'elements/s':>12}")
+        for num_lines in sizes:
+            inputs = {}
+            for language in sorted({case[1] for case in cases}):
+                path = os.path.join(temp_dir, f'input_{num_lines}.{language}')
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(generate_source(language, num_lines))
+                inputs[language] = path
+
+            for name, language, func in cases:
+                work_path = os.path.join(temp_dir, f'work.{language}')
+                result = measure(func, inputs[language], work_path, args.repeat)
+                key = f'{name}@{size_label(num_lines)}'
+                results[key] = result
+                print(f"{key:<32} {result['seconds']:>10.4f} {result['peak_bytes'] / 2**20:>10.1f} "
+                      f"{result['elements_per_second']:>12.0f}")
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    if args.json_out:
+        with open(args.json_out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, so nothing was compared; record one on this machine "
+              f"with --save-baseline {args.baseline}")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if (baseline.get('python'), baseline.get('platform')) != (report['python'], report['platform']):
+        print(f"\nNote: the baseline was recorded with Python {baseline.get('python')} on "
+              f"{baseline.get('platform')}; timings may not be comparable")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
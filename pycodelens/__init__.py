@@ -2,6 +2,10 @@
 PyCodeLens - A Python code analysis tool to extract code elements.
 """
 
-from .analyzer import extract_code_elements, analyze_file
-
 __version__ = '0.1.0'
+
+from .analyzer import (extract_code_elements, extract_code_elements_from_string, analyze_file,
+                       analyze_source, replace_element, replace_elements)
+from .cache import ResultCache
+from .profiling import Profiler
+from .scanner import analyze_tree
@@ -4,234 +4,699 @@ Core analysis functionality for PyCodeLens.
 
 import sys
 import os
-import astroid
 import re
+import bisect
+import fnmatch
+import importlib
+import mmap
+from array import array
 from collections import defaultdict
+from itertools import islice
+from collections.abc import Mapping
+
+from . import profiling
+
+class SourceBuffer:
+    """
+    The text of one parsed file, shared by all element records built from it.
+    
+    Records keep character offsets into the buffer instead of their own copy
+    of the source, so nested elements (such as methods inside classes) do not
+    duplicate text and nothing is copied until a slice is requested.
+    """
+    
+    __slots__ = ('_data', '_line_starts')
+    
+    # Line separator in the type of the buffer's data
+    _NEWLINE = '\n'
+    
+    def __init__(self, text):
+        self._data = text
+        self._line_starts = None
+    
+    def __reduce__(self):
+        # The line index is cheap to rebuild, so it is not pickled
+        return (SourceBuffer, (self.text,))
+    
+    def detach(self):
+        """
+        Make the buffer independent of the file it was read from, so that
+        records built from it stay valid after the file changes.
+        
+        A no-op here: the text is already held in memory.
+        """
+    
+    @property
+    def text(self):
+        """The whole text as a string."""
+        return self._data
+    
+    @property
+    def data(self):
+        """The buffer scanned by parsers (the text itself for this class)."""
+        return self._data
+    
+    def encoded(self):
+        """The text as UTF-8 bytes (or any bytes-like object), for hashing."""
+        return self._data.encode('utf-8', 'surrogatepass')
+    
+    @property
+    def line_starts(self):
+        """Offsets at which each line of the text begins (built on first use)."""
+        if self._line_starts is None:
+            self._line_starts = [0]
+            self._line_starts.extend(m.end() for m in re.finditer(self._NEWLINE, self._data))
+        return self._line_starts
+    
+    @property
+    def num_lines(self):
+        """Number of lines in the text (a trailing newline does not start a line)."""
+        count = len(self.line_starts)
+        if self._data[-1:] == self._NEWLINE:
+            count -= 1
+        return count
+    
+    def line_number(self, offset):
+        """Return the 1-based line number containing a character offset."""
+        return bisect.bisect_right(self.line_starts, offset)
+    
+    def line_span(self, start_line, end_line):
+        """
+        Convert an inclusive 1-based line range to character offsets.
+        
+        Returns:
+            Tuple of (start, end) offsets, excluding the final newline
+        """
+        line_starts = self.line_starts
+        start_line = max(start_line, 1)
+        end_line = min(end_line, self.num_lines)
+        if start_line > end_line:
+            return 0, 0
+        start = line_starts[start_line - 1]
+        end = line_starts[end_line] - 1 if end_line < len(line_starts) else len(self._data)
+        return start, end
+    
+    def slice(self, start, end):
+        """Return the text between two offsets."""
+        return self._data[start:end]
+    
+    def get_lines(self, start_line, end_line):
+        """Return the text of an inclusive 1-based line range."""
+        start, end = self.line_span(start_line, end_line)
+        return self.slice(start, end)
+
+
+class BytesSourceBuffer(SourceBuffer):
+    """
+    UTF-8 text kept as bytes and decoded only one slice at a time.
+    
+    Parsers scan the bytes directly and offsets are byte offsets, so a
+    large file is never held in memory as a whole string.
+    """
+    
+    __slots__ = ()
+    
+    _NEWLINE = b'\n'
+    
+    def __reduce__(self):
+        return (BytesSourceBuffer, (bytes(self._data),))
+    
+    @property
+    def text(self):
+        """The whole file decoded (a full copy; prefer slice())."""
+        return self.slice(0, len(self._data))
+    
+    @property
+    def line_starts(self):
+        if self._line_starts is None:
+            # 8 bytes per line instead of a list of int objects
+            self._line_starts = array('q', [0])
+            self._line_starts.extend(m.end() for m in re.finditer(self._NEWLINE, self._data))
+        return self._line_starts
+    
+    def encoded(self):
+        return self._data
+    
+    def slice(self, start, end):
+        return self._data[start:end].decode('utf-8', 'replace')
+
+
+class MappedSourceBuffer(BytesSourceBuffer):
+    """
+    A UTF-8 file mapped into memory instead of read into a string.
+    
+    The mapping reflects the file as it is on disk: if the file is rewritten,
+    slices change or fault. It is only scanned while the file is parsed;
+    extract_code_elements() and find_first_element() call detach() before
+    handing the parser or its records back, and pickling copies the bytes
+    too.
+    """
+    
+    __slots__ = ()
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(data)
+    
+    def detach(self):
+        """Copy the mapped bytes into memory and drop the mapping."""
+        if isinstance(self._data, mmap.mmap):
+            # Not closed explicitly: slices being decoded elsewhere may still hold it
+            self._data = bytes(self._data)
+
+
+class Record(Mapping):
+    """
+    Compact element record with a read-only dict view.
+    
+    Fields live in __slots__ rather than in a per-record hash table, which
+    keeps the many small records of a large file cheap. Records index,
+    iterate and compare like dictionaries but are not dicts: pass
+    json_default as the `default` of json.dumps() to serialize them.
+    Public functions return plain dictionaries (see to_dicts) unless called
+    with records=True.
+    
+    Subclasses list their keys, in output order, in _keys; keys also named
+    in _computed are properties derived from other state and not stored.
+    """
+    
+    __slots__ = ()
+    
+    _keys = ()
+    _computed = ()
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._key_set = frozenset(cls._keys)
+        cls._stored = tuple(key for key in cls._keys if key not in cls._computed)
+        # Every slot, so that copies carry private state (such as the source) too
+        cls._state = tuple(name for klass in reversed(cls.__mro__)
+                           for name in klass.__dict__.get('__slots__', ()))
+        if '_keys' in cls.__dict__:
+            _RECORD_TYPES[frozenset(cls._stored)] = cls
+    
+    def __getitem__(self, key):
+        if key in self._key_set:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __setitem__(self, key, value):
+        if key not in self._key_set or key in self._computed:
+            raise KeyError(f"{type(self).__name__} has no settable field {key!r}")
+        setattr(self, key, value)
+    
+    def __contains__(self, key):
+        return key in self._key_set
+    
+    def __iter__(self):
+        return iter(self._keys)
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __repr__(self):
+        return repr(dict(self.items()))
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._key_set else default
+    
+    def copy(self):
+        record = type(self).__new__(type(self))
+        for name in self._state:
+            setattr(record, name, getattr(self, name))
+        return record
+    
+    def fields(self):
+        """Return the stored fields as a plain dictionary (without computed keys)."""
+        return {key: _plain(getattr(self, key)) for key in self._stored}
+
+
+def _plain(value):
+    if isinstance(value, list):
+        return [item.fields() if isinstance(item, Record) else item for item in value]
+    return value
+
+
+# Record classes by the set of their stored keys, for make_record()
+_RECORD_TYPES = {}
+
+
+class CodeElement(Record):
+    """
+    Element record (function, class, method, interface) with a lazy source.
+    
+    'source_code' is not stored: it is sliced from the shared SourceBuffer
+    whenever it is read, including when the record is serialized to JSON.
+    """
+    
+    __slots__ = ('name', 'qualname', 'line_start', 'line_end', '_source', '_start', '_end')
+    
+    _keys = ('name', 'qualname', 'line_start', 'line_end', 'source_code')
+    _computed = ('source_code',)
+    
+    def __init__(self, source, name, qualname, line_start, line_end):
+        self.name = name
+        self.qualname = qualname
+        self.line_start = line_start
+        self.line_end = line_end
+        self._source = source
+        self._start, self._end = source.line_span(line_start, line_end)
+    
+    @property
+    def source_code(self):
+        return self._source.slice(self._start, self._end)
+
+
+class FunctionElement(CodeElement):
+    """Python function or method record with its decorators."""
+    
+    __slots__ = ('decorators',)
+    
+    _keys = ('name', 'qualname', 'line_start', 'line_end', 'decorators', 'source_code')
+    
+    def __init__(self, source, name, qualname, line_start, line_end, decorators=None):
+        super().__init__(source, name, qualname, line_start, line_end)
+        self.decorators = [] if decorators is None else decorators
+
+
+class ClassElement(CodeElement):
+    """Class record with its methods."""
+    
+    __slots__ = ('methods',)
+    
+    _keys = ('name', 'qualname', 'line_start', 'line_end', 'methods', 'source_code')
+    
+    def __init__(self, source, name, qualname, line_start, line_end, methods=None):
+        super().__init__(source, name, qualname, line_start, line_end)
+        self.methods = [] if methods is None else methods
+
+
+class Decorator(Record):
+    """
+    Decorator record.
+    
+    The same record is listed in its function's 'decorators' and in the
+    results' top-level 'decorators', so it is stored once.
+    """
+    
+    __slots__ = ('name', 'line', 'parent')
+    
+    _keys = ('name', 'line', 'parent')
+    
+    def __init__(self, name, line, parent):
+        self.name = name
+        self.line = line
+        self.parent = parent
+
+
+class PrintCall(Record):
+    """Python print() call record."""
+    
+    __slots__ = ('line', 'args')
+    
+    _keys = ('line', 'args')
+    
+    def __init__(self, line, args):
+        self.line = line
+        self.args = args
+
+
+def make_record(fields, source=None):
+    """
+    Build the record type whose stored keys match a plain dictionary.
+    
+    Element records read their source from `source`. Nested lists (such as
+    'decorators' and 'methods') are converted too.
+    
+    Returns:
+        The record, or the dictionary itself if no record type matches
+    """
+    record_type = _RECORD_TYPES.get(frozenset(fields))
+    if record_type is None:
+        return fields
+    values = {key: [make_record(item, source) if isinstance(item, dict) else item for item in value]
+              if isinstance(value, list) else value
+              for key, value in fields.items()}
+    if issubclass(record_type, CodeElement):
+        return record_type(source, **values)
+    return record_type(**values)
+
+
+def json_default(value):
+    """`default` hook for json.dumps() that serializes records as objects."""
+    if isinstance(value, Record):
+        return dict(value.items())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def to_dicts(value):
+    """
+    Convert records, and the lists and results holding them, to plain
+    dictionaries with 'source_code' read into a string.
+    
+    Keys of results starting with '_' (such as '_parser') are left as they are.
+    """
+    if isinstance(value, Record):
+        return {key: to_dicts(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [to_dicts(item) for item in value]
+    if isinstance(value, dict):
+        return {key: item if key.startswith('_') else to_dicts(item) for key, item in value.items()}
+    return value
+
+
+def strip_sources(results):
+    """Return results with records replaced by plain field dicts."""
+    return {key: _plain(value) for key, value in results.items()}
+
+
+def without_source(value):
+    """Return a copy of results or records with every 'source_code' left out."""
+    if isinstance(value, Record):
+        return value.fields()
+    if isinstance(value, dict):
+        return {k: without_source(v) for k, v in value.items() if k != 'source_code'}
+    if isinstance(value, list):
+        return [without_source(item) for item in value]
+    return value
+
+
+def bind_sources(results, source):
+    """Inverse of strip_sources(): rebuild records, reading sources from a buffer."""
+    results = {key: [make_record(item, source) if isinstance(item, dict) else item for item in value]
+               if isinstance(value, list) else value
+               for key, value in results.items()}
+    # Share the decorator records of the functions with the top-level list again
+    shared = [decorator for function in results.get('functions', [])
+              for decorator in function.get('decorators', ())]
+    if shared and shared == results.get('decorators'):
+        results['decorators'] = shared
+    return results
+
+
+def iter_elements(results):
+    """
+    Yield (element_type, element) for every function, method, class and
+    interface of a results dictionary.
+    
+    Python methods appear both as functions and inside their classes; each
+    is yielded once, as a 'function'.
+    """
+    functions = list(results.get('functions', []))
+    for cls in results.get('classes', []):
+        functions.extend(cls.get('methods', []))
+    
+    for element_type, elements in (('function', functions),
+                                   ('class', results.get('classes', [])),
+                                   ('interface', results.get('interfaces', []))):
+        seen = set()
+        for element in elements:
+            identity = (element.get('qualname', element['name']), element['line_start'], element['line_end'])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            yield element_type, element
+
+
+class ElementIndex:
+    """
+    Name lookup tables for the elements of one results dictionary.
+    
+    Every function, method, class and interface can be found by its plain
+    name and by its qualified name (such as 'Class.method'). A name maps to
+    all matching elements, in the order a linear scan of the results would
+    find them, so callers can tell when a plain name is ambiguous.
+    """
+    
+    def __init__(self, results):
+        self._tables = {'function': {}, 'class': {}, 'interface': {}}
+        for element_type, element in iter_elements(results):
+            table = self._tables[element_type]
+            qualname = element.get('qualname', element['name'])
+            table.setdefault(element['name'], []).append(element)
+            if qualname != element['name']:
+                table.setdefault(qualname, []).append(element)
+    
+    def find(self, name, element_type='function'):
+        """Return all elements of a type matching a plain or qualified name."""
+        return self._tables.get(element_type, {}).get(name, [])
+
+
+def get_element_index(results):
+    """Return the name index of a results dictionary, building it on first use."""
+    index = results.get('_index')
+    if index is None:
+        index = results['_index'] = ElementIndex(results)
+    return index
+
+
+def find_elements(results, name, element_type='function'):
+    """
+    Find all elements matching a name.
+    
+    Args:
+        results: Results from extract_code_elements
+        name: Plain name ('method') or qualified name ('Class.method')
+        element_type: Type of element ('function', 'class' or 'interface');
+            'function' also matches class methods
+        
+    Returns:
+        List of matching element records, empty if there are none
+    """
+    # A copy: the index's own list must not change under later lookups
+    return list(get_element_index(results).find(name, element_type))
+
+
+def is_glob_pattern(name):
+    """Return True if a name contains glob wildcards ('*', '?' or '[')."""
+    return any(char in name for char in '*?[')
+
+
+def find_elements_matching(results, patterns, element_type='function'):
+    """
+    Find the elements matching each of several names or glob patterns.
+    
+    Plain and qualified names are looked up in the name index; glob
+    patterns (such as 'test_*' or 'Widget.*') are matched against the plain
+    and qualified name of every element in a single pass over the results.
+    
+    Args:
+        results: Results from extract_code_elements
+        patterns: Names, qualified names or glob patterns
+        element_type: Type of element ('function', 'class' or 'interface');
+            'function' also matches class methods
+        
+    Returns:
+        Dictionary mapping each pattern to its list of matching element
+        records, in source order
+    """
+    matches = {pattern: [] for pattern in patterns}
+    globs = [pattern for pattern in matches if is_glob_pattern(pattern)]
+    for pattern in matches:
+        if pattern not in globs:
+            matches[pattern] = find_elements(results, pattern, element_type)
+    if globs:
+        for found_type, element in iter_elements(results):
+            if found_type != element_type:
+                continue
+            names = (element['name'], element.get('qualname', element['name']))
+            for pattern in globs:
+                if any(fnmatch.fnmatchcase(name, pattern) for name in names):
+                    matches[pattern].append(element)
+    return matches
+
+
+# Kinds of elements a results dictionary holds, for the `want` arguments
+ELEMENT_KINDS = ('functions', 'classes', 'interfaces', 'decorators', 'print_calls')
+
+# Kind of the results searched by name lookups of each element type
+ELEMENT_TYPE_KINDS = {'function': 'functions', 'class': 'classes', 'interface': 'interfaces'}
+
+
+def normalize_want(want):
+    """
+    Validate a `want` argument: an iterable of ELEMENT_KINDS, or None for all.
+    
+    Returns:
+        Frozen set of element kinds
+    """
+    if want is None:
+        return frozenset(ELEMENT_KINDS)
+    want = frozenset(want)
+    unknown = want.difference(ELEMENT_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown element kinds: {', '.join(sorted(unknown))}")
+    return want
+
 
 class BaseCodeParser:
-    """Base class for language-specific code parsers."""
+    """
+    Base class for language-specific code parsers.
+    
+    Parsers read file_path, unless the code is given; then file_path only
+    names it (in error messages and results) and is never opened.
+    """
     
-    def __init__(self, file_path):
+    def __init__(self, file_path, code=None):
         self.file_path = file_path
+        with profiling.phase('read'):
+            self.source = self.load_source(file_path) if code is None else SourceBuffer(code)
+        profiling.count('files')
+        self._lines = None
+    
+    def load_source(self, file_path):
+        """Read a file into the buffer that element sources are sliced from."""
         with open(file_path, 'r', encoding='utf-8') as f:
-            self.code = f.read()
-        self.lines = self.code.splitlines()
+            code = f.read()
+            if profiling.active():
+                profiling.count('bytes_read', os.fstat(f.fileno()).st_size)
+        return SourceBuffer(code)
+    
+    @property
+    def code(self):
+        """The code of the file as a string."""
+        return self.source.text
+    
+    @property
+    def lines(self):
+        """The code split into lines (built on first use)."""
+        if self._lines is None:
+            self._lines = self.code.splitlines()
+        return self._lines
     
-    def extract_elements(self):
-        """Extract code elements. Must be implemented by subclasses."""
+    @property
+    def line_starts(self):
+        """Offsets at which each line of the code begins."""
+        return self.source.line_starts
+    
+    def line_number(self, offset):
+        """Return the 1-based line number containing a character offset."""
+        return self.source.line_number(offset)
+    
+    def extract_elements(self, want=None):
+        """
+        Extract code elements. Must be implemented by subclasses.
+        
+        Args:
+            want: Element kinds to extract (see ELEMENT_KINDS), or None for
+                all; results hold a list for each wanted kind the language has
+        """
         raise NotImplementedError
+    
+    def find_first(self, name, element_type='function'):
+        """
+        Find the first element matching a plain or qualified name.
+        
+        Extracts only the kind searched for; parsers that can stop their
+        walk at the first match override this.
+        
+        Returns:
+            The element record, or None if there is no match
+        """
+        kind = ELEMENT_TYPE_KINDS.get(element_type)
+        if kind is None:
+            return None
+        matches = find_elements(self.extract_elements(want=[kind]), name, element_type)
+        return matches[0] if matches else None
         
     def get_source_by_name(self, results, name, element_type='function'):
-        """Get source code by element name."""
-        if element_type == 'function':
-            for func in results['functions']:
-                if func['name'] == name:
-                    return func['source_code']
-            # Check class methods
-            for cls in results['classes']:
-                for method in cls['methods']:
-                    if method['name'] == name:
-                        return method['source_code']
-        elif element_type == 'class':
-            for cls in results['classes']:
-                if cls['name'] == name:
-                    return cls['source_code']
-                    
+        """Get source code by element name (the first match if ambiguous)."""
+        matches = find_elements(results, name, element_type)
+        if matches:
+            return matches[0]['source_code']
         return None
         
     def get_source_by_lines(self, start_line, end_line):
         """Get source code by line numbers."""
-        end_idx = min(end_line, len(self.lines))
-        return '\n'.join(self.lines[start_line-1:end_idx])
-
-
-class PythonParser(BaseCodeParser):
-    """Parser for Python code using astroid."""
-    
-    def extract_elements(self):
-        """Extract code elements from Python file."""
-        # Parse the file using astroid
-        module = astroid.parse(self.code, self.file_path)
-        
-        functions = []
-        decorators = []
-        classes = []
-        print_calls = []
-        
-        # Extract functions and their details
-        for node in module.nodes_of_class(astroid.FunctionDef):
-            func_info = {
-                'name': node.name,
-                'line_start': node.lineno,
-                'line_end': node.end_lineno,
-                'decorators': [],
-                'source_code': '\n'.join(self.lines[node.lineno-1:node.end_lineno])
-            }
-            
-            # Extract decorators for this function
-            if node.decorators:
-                for decorator in node.decorators.nodes:
-                    decorator_name = ""
-                    if isinstance(decorator, astroid.Name):
-                        decorator_name = decorator.name
-                    elif isinstance(decorator, astroid.Call) and isinstance(decorator.func, astroid.Name):
-                        decorator_name = decorator.func.name
-                        
-                    if decorator_name:
-                        func_info['decorators'].append({
-                            'name': decorator_name,
-                            'line': decorator.lineno
-                        })
-                        decorators.append({
-                            'name': decorator_name,
-                            'line': decorator.lineno,
-                            'parent': node.name
-                        })
-            
-            functions.append(func_info)
-        
-        # Extract classes
-        for node in module.nodes_of_class(astroid.ClassDef):
-            class_info = {
-                'name': node.name,
-                'line_start': node.lineno,
-                'line_end': node.end_lineno,
-                'methods': [],
-                'source_code': '\n'.join(self.lines[node.lineno-1:node.end_lineno])
-            }
-            
-            # Extract methods within the class
-            for method_node in node.nodes_of_class(astroid.FunctionDef):
-                method_info = {
-                    'name': method_node.name,
-                    'line_start': method_node.lineno,
-                    'line_end': method_node.end_lineno,
-                    'source_code': '\n'.join(self.lines[method_node.lineno-1:method_node.end_lineno])
-                }
-                class_info['methods'].append(method_info)
-                
-            classes.append(class_info)
-        
-        # Extract print statements
-        for node in module.nodes_of_class(astroid.Call):
-            if isinstance(node.func, astroid.Name) and node.func.name == 'print':
-                print_calls.append({
-                    'line': node.lineno,
-                    'args': len(node.args)
-                })
-        
-        return {
-            'functions': functions,
-            'decorators': decorators,
-            'classes': classes,
-            'print_calls': print_calls,
-        }
+        return self.source.get_lines(start_line, end_line)
 
 
-class JavaScriptParser(BaseCodeParser):
-    """Basic parser for JavaScript code."""
-    
-    def extract_elements(self):
-        """Extract code elements from JavaScript file."""
-        # This is a simplified implementation
-        # A real implementation would use a proper JavaScript parser
-        
-        functions = []
-        classes = []
-        
-        # Basic regex-based parsing for demonstration
-        
-        # Find function declarations
-        func_pattern = r'function\s+(\w+)\s*\([^)]*\)\s*\{'
-        function_matches = re.finditer(func_pattern, self.code)
-        
-        for match in function_matches:
-            func_name = match.group(1)
-            line_number = self.code[:match.start()].count('\n') + 1
-            
-            # Find the end of the function (simplification)
-            end_line = line_number
-            brace_count = 1
-            for i, line in enumerate(self.lines[line_number:], line_number+1):
-                if '{' in line:
-                    brace_count += line.count('{')
-                if '}' in line:
-                    brace_count -= line.count('}')
-                    if brace_count == 0:
-                        end_line = i
-                        break
-            
-            functions.append({
-                'name': func_name,
-                'line_start': line_number,
-                'line_end': end_line,
-                'source_code': '\n'.join(self.lines[line_number-1:end_line])
-            })
-        
-        # Find class declarations (ES6)
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+\w+)?\s*\{'
-        class_matches = re.finditer(class_pattern, self.code)
-        
-        for match in class_matches:
-            class_name = match.group(1)
-            line_number = self.code[:match.start()].count('\n') + 1
-            
-            # Find the end of the class
-            end_line = line_number
-            brace_count = 1
-            for i, line in enumerate(self.lines[line_number:], line_number+1):
-                if '{' in line:
-                    brace_count += line.count('{')
-                if '}' in line:
-                    brace_count -= line.count('}')
-                    if brace_count == 0:
-                        end_line = i
-                        break
-            
-            classes.append({
-                'name': class_name,
-                'line_start': line_number,
-                'line_end': end_line,
-                'methods': [],  # Simplified
-                'source_code': '\n'.join(self.lines[line_number-1:end_line])
-            })
-        
-        return {
-            'functions': functions,
-            'classes': classes,
-            'decorators': [],  # JavaScript doesn't have Python-style decorators
-            'print_calls': [],  # Not tracking console.log statements
-        }
-
-
-def get_parser_for_file(file_path):
-    """Factory function to get the appropriate parser for a file."""
-    file_ext = os.path.splitext(file_path)[1].lower()
-    
-    if file_ext == '.py':
-        return PythonParser(file_path)
-    elif file_ext in ['.js', '.jsx']:
-        return JavaScriptParser(file_path)
-    elif file_ext in ['.ts', '.tsx']:
-        return TypeScriptParser(file_path)
-    else:
-        raise ValueError(f"Unsupported file type: {file_ext}")
+# Python parsing backends accepted by PythonParser
+PYTHON_ENGINES = ('astroid', 'ast')
+
+
+def decode_source(data):
+    """Decode UTF-8 file content as reading it in text mode would (universal newlines)."""
+    return data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
 
-def extract_code_elements(file_path):
+
+def extract_code_elements(file_path, cache=None, engine=None, want=None, code=None, language=None,
+                          records=False):
     """
     Extract code elements from a file using the appropriate parser.
     
     Args:
         file_path: Path to the file to analyze
+        cache: Optional ResultCache used to skip parsing unchanged files
+        engine: Python parsing engine ('astroid' or 'ast')
+        want: Element kinds to extract, such as {'functions'} (see
+            ELEMENT_KINDS); None extracts everything. Walks needed only for
+            other kinds are skipped. The cache holds complete results, so
+            with a cache every kind is extracted and the rest left out.
+        code: Source text to analyze instead of the file's content (such
+            as an older revision of it)
+        language: Language of the code (see LANGUAGES), overriding the
+            file extension
+        records: Return elements as compact read-only Record objects,
+            which slice their source lazily, instead of plain dictionaries;
+            serialize them with json.dumps(..., default=json_default)
         
     Returns:
         Dictionary containing lists of code elements
     """
-    parser = get_parser_for_file(file_path)
-    results = parser.extract_elements()
-    # Store the parser for later use
+    want = normalize_want(want)
+    partial = want != normalize_want(None)
+    parser = get_parser_for_file(file_path, engine, code, language)
+    results = None
+    if cache is not None:
+        with profiling.phase('cache'):
+            cache_key = cache.key_for(parser)
+            results = cache.get(cache_key)
+            if results is not None:
+                results = bind_sources(results, parser.source)
+        profiling.count('cache_hits' if results is not None else 'cache_misses')
+    if results is None:
+        # Parsing is timed as its own nested phase; 'walk' is the extraction proper
+        with profiling.phase('walk'):
+            results = parser.extract_elements(want=None if cache is not None else want)
+        if cache is not None:
+            with profiling.phase('cache'):
+                cache.put(cache_key, strip_sources(results))
+    if partial:
+        results = {key: value for key, value in results.items() if key in want}
+    profiling.count('elements', sum(len(value) for value in results.values() if isinstance(value, list)))
+    # Store the parser for later use; the caller may keep it long after the
+    # file has changed, so it must not read a live mapping of it
+    parser.source.detach()
     results['_parser'] = parser
-    return results
+    return results if records else to_dicts(results)
+
+
+def find_first_element(file_path, name, element_type='function', engine=None, records=False):
+    """
+    Find the first element of a file matching a name, without a full extraction.
+    
+    Only the searched kind is extracted, and the Python parser stops walking
+    at the first match, so this is cheaper than extract_code_elements() plus
+    find_elements() when ambiguity does not matter.
+    
+    Args:
+        file_path: Path to the file to search
+        name: Plain name ('method') or qualified name ('Class.method')
+        element_type: Type of element ('function', 'class' or 'interface')
+        engine: Python parsing engine ('astroid' or 'ast')
+        records: Return a Record (whose 'source_code' is read on access)
+            instead of a dictionary
+        
+    Returns:
+        The element, or None
+    """
+    parser = get_parser_for_file(file_path, engine)
+    with profiling.phase('walk'):
+        element = parser.find_first(name, element_type)
+    parser.source.detach()
+    return element if records else to_dicts(element)
 
 
 def get_source_by_name(results, name, element_type='function'):
@@ -240,14 +705,19 @@ def get_source_by_name(results, name, element_type='function'):
     
     Args:
         results: Results from extract_code_elements
-        name: Name of the element
-        element_type: Type of element ('function' or 'class')
+        name: Name of the element, or its qualified name ('Class.method')
+            to pick one of several elements sharing a name
+        element_type: Type of element ('function', 'class' or 'interface')
         
     Returns:
-        Source code as string or None if not found
+        Source code as string (of the first match if the name is ambiguous;
+        use find_elements() to get all of them) or None if not found
     """
     if '_parser' in results:
         return results['_parser'].get_source_by_name(results, name, element_type)
+    matches = find_elements(results, name, element_type)
+    if matches:
+        return matches[0]['source_code']
     return None
 
 
@@ -256,40 +726,170 @@ def get_source_by_lines(results, start_line, end_line):
     Get source code by line numbers.
     
     Args:
-        results: Results from extract_code_elements
+        results: Results from extract_code_elements, or the path of a file
+            to read the lines from without parsing it (see read_line_ranges)
         start_line: Starting line number (1-based)
         end_line: Ending line number (1-based)
         
     Returns:
         Source code as string
     """
+    if isinstance(results, (str, os.PathLike)):
+        return read_line_ranges(results, [(start_line, end_line)])[0]
     if '_parser' in results:
         return results['_parser'].get_source_by_lines(start_line, end_line)
     return None
 
 
-def analyze_file(file_path):
+def read_line_ranges(file_path, ranges):
+    """
+    Read inclusive 1-based line ranges from a file without parsing it.
+    
+    The file is streamed in one pass that skips the lines between ranges
+    and stops after the last requested line, so only the requested lines
+    are kept in memory and the rest of the file is never read.
+    
+    Args:
+        file_path: Path to the file
+        ranges: Iterable of (start_line, end_line) tuples, in any order and
+            possibly overlapping
+        
+    Returns:
+        List with the text of each range in the given order (without the
+        final newline, like SourceBuffer.get_lines); ranges beyond the end
+        of the file are clipped, and empty if nothing is left
+    """
+    ranges = [(max(start_line, 1), end_line) for start_line, end_line in ranges]
+    # Merge overlapping and adjacent ranges into the spans that are read
+    spans = []
+    for start_line, end_line in sorted(r for r in ranges if r[0] <= r[1]):
+        if spans and start_line <= spans[-1][1] + 1:
+            spans[-1][1] = max(spans[-1][1], end_line)
+        else:
+            spans.append([start_line, end_line])
+    
+    lines = {}
+    with profiling.phase('read'), open(file_path, 'r', encoding='utf-8') as f:
+        position = 0
+        for start_line, end_line in spans:
+            # Consume the skipped lines without keeping them
+            for _ in islice(f, start_line - 1 - position):
+                pass
+            chunk = list(islice(f, end_line - start_line + 1))
+            lines.update(zip(range(start_line, start_line + len(chunk)), chunk))
+            position = start_line - 1 + len(chunk)
+            if position < end_line:
+                break
+    
+    last_line = max(lines, default=0)
+    texts = []
+    for start_line, end_line in ranges:
+        text = ''.join(lines[line] for line in range(start_line, min(end_line, last_line) + 1))
+        texts.append(text[:-1] if text.endswith('\n') else text)
+    return texts
+
+
+def analyze_file(file_path, cache=None, engine=None, want=None, summary=True, records=False):
     """
     Analyze a file and return formatted results.
     
     Args:
         file_path: Path to the file to analyze
+        cache: Optional ResultCache used to skip parsing unchanged files
+        engine: Python parsing engine ('astroid' or 'ast')
+        want: Element kinds to extract (see extract_code_elements)
+        summary: Whether to build the summary; if False, 'summary' is None
+        records: Return elements as Records (see extract_code_elements)
         
     Returns:
         Dictionary with analysis results and formatted output
     """
-    results = extract_code_elements(file_path)
+    return _analysis(file_path, extract_code_elements(file_path, cache, engine, want, records=records), summary)
+
+
+def extract_code_elements_from_string(code, language=None, filename=None, engine=None, want=None,
+                                      records=False):
+    """
+    Extract code elements from source text, such as an unsaved editor buffer.
     
-    # Generate summary
+    Nothing is read from or written to disk.
+    
+    Args:
+        code: Source text to analyze
+        language: Language of the code (see LANGUAGES); may be left out if
+            filename has a supported extension
+        filename: Name used in results and error messages (default
+            '<string>'); the file is never opened
+        engine: Python parsing engine ('astroid' or 'ast')
+        want: Element kinds to extract (see extract_code_elements)
+        records: Return elements as Records (see extract_code_elements)
+        
+    Returns:
+        Dictionary containing lists of code elements, as extract_code_elements
+    """
+    if language is None and (filename is None or not is_supported_file(filename)):
+        raise ValueError("Give the language of the code or a filename with a supported extension")
+    return extract_code_elements(filename or '<string>', engine=engine, want=want, code=code, language=language,
+                                 records=records)
+
+
+def analyze_source(code, language=None, filename=None, engine=None, want=None, summary=True, records=False):
+    """
+    Analyze source text and return formatted results, without any file I/O.
+    
+    Args:
+        code: Source text to analyze
+        language: Language of the code (see LANGUAGES); may be left out if
+            filename has a supported extension
+        filename: Name used in results and the summary (default '<string>')
+        engine: Python parsing engine ('astroid' or 'ast')
+        want: Element kinds to extract (see extract_code_elements)
+        summary: Whether to build the summary; if False, 'summary' is None
+        records: Return elements as Records (see extract_code_elements)
+        
+    Returns:
+        Dictionary with analysis results and formatted output, as analyze_file
+    """
+    results = extract_code_elements_from_string(code, language, filename, engine, want, records)
+    return _analysis(filename or '<string>', results, summary)
+
+
+def _analysis(file_path, results, summary):
+    """Wrap extracted results with their summary (if wanted) as returned by analyze_file."""
+    if summary:
+        with profiling.phase('summary'):
+            summary = build_summary(file_path, results)
+    else:
+        summary = None
+    return {
+        'raw_results': results,
+        'summary': summary
+    }
+
+
+def build_summary(file_path, results):
+    """
+    Summarize extracted code elements.
+    
+    Kinds missing from results (see the `want` argument of
+    extract_code_elements) are summarized as empty.
+    
+    Args:
+        file_path: Path of the analyzed file
+        results: Results from extract_code_elements
+        
+    Returns:
+        Dictionary of element counts, names and decorator statistics
+    """
     summary = {
         'file': file_path,
-        'num_functions': len(results['functions']),
+        'num_functions': len(results.get('functions', [])),
         'num_decorators': len(results.get('decorators', [])),
-        'num_classes': len(results['classes']),
+        'num_classes': len(results.get('classes', [])),
         'num_print_statements': len(results.get('print_calls', [])),
-        'function_names': [f['name'] for f in results['functions']],
+        'function_names': [f['name'] for f in results.get('functions', [])],
         'decorator_names': sorted(set(d['name'] for d in results.get('decorators', []))),
-        'class_names': [c['name'] for c in results['classes']]
+        'class_names': [c['name'] for c in results.get('classes', [])]
     }
     
     # Group decorators by name
@@ -303,109 +903,333 @@ def analyze_file(file_path):
     summary['decorator_counts'] = dict(decorator_counts)
     summary['decorator_lines'] = dict(decorator_lines)
     
-    return {
-        'raw_results': results,
-        'summary': summary
-    }
+    return summary
+
+# Maps lower-cased file extensions to the module and name of the parser
+# class that handles them. Parser modules are imported only when a file
+# needs them, so that analyzing JavaScript does not pay for importing astroid.
+PARSERS_BY_EXTENSION = {
+    '.py': ('python_parser', 'PythonParser'),
+    '.js': ('javascript_parser', 'JavaScriptParser'),
+    '.jsx': ('javascript_parser', 'JavaScriptParser'),
+    '.ts': ('javascript_parser', 'TypeScriptParser'),
+    '.tsx': ('javascript_parser', 'TypeScriptParser'),
+}
+
+# Language names accepted by analyze_source and --lang, and the extension
+# whose parser handles each
+LANGUAGES = {
+    'python': '.py',
+    'javascript': '.js',
+    'jsx': '.jsx',
+    'typescript': '.ts',
+    'tsx': '.tsx',
+}
+
+# Names defined in the parser modules that used to live here
+_PARSER_MODULE_NAMES = {
+    'PythonParser': 'python_parser',
+    'JavaScriptParser': 'javascript_parser',
+    'TypeScriptParser': 'javascript_parser',
+    'match_braces': 'javascript_parser',
+    'MMAP_THRESHOLD': 'javascript_parser',
+}
+
+
+def __getattr__(name):
+    # Resolve parser names on first access without importing their modules up front
+    module_name = _PARSER_MODULE_NAMES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module('.' + module_name, __package__), name)
 
-class TypeScriptParser(BaseCodeParser):
-    """Parser for TypeScript code."""
+
+def is_supported_file(file_path):
+    """Return True if a parser exists for the file's extension."""
+    return os.path.splitext(file_path)[1].lower() in PARSERS_BY_EXTENSION
+
+
+def get_parser_for_file(file_path, engine=None, code=None, language=None):
+    """
+    Factory function to get the appropriate parser for a file.
     
-    def extract_elements(self):
-        """Extract code elements from TypeScript file."""
-        functions = []
-        classes = []
-        interfaces = []
-        
-        # Parse functions
-        func_pattern = r'function\s+(\w+)\s*\([^)]*\)\s*(?::\s*\w+(?:\[\]|\<.*\>)?)?\s*\{'
-        function_matches = re.finditer(func_pattern, self.code)
-        
-        for match in function_matches:
-            func_name = match.group(1)
-            line_number = self.code[:match.start()].count('\n') + 1
-            
-            # Find the end of the function
-            end_line = line_number
-            brace_count = 1
-            for i, line in enumerate(self.lines[line_number:], line_number+1):
-                if '{' in line:
-                    brace_count += line.count('{')
-                if '}' in line:
-                    brace_count -= line.count('}')
-                    if brace_count == 0:
-                        end_line = i
-                        break
-            
-            functions.append({
-                'name': func_name,
-                'line_start': line_number,
-                'line_end': end_line,
-                'source_code': '\n'.join(self.lines[line_number-1:end_line])
-            })
-        
-        # Parse classes
-        class_pattern = r'class\s+(\w+)(?:\s+(?:extends|implements)\s+\w+)?\s*\{'
-        class_matches = re.finditer(class_pattern, self.code)
-        
-        for match in class_matches:
-            class_name = match.group(1)
-            line_number = self.code[:match.start()].count('\n') + 1
-            
-            # Find the end of the class
-            end_line = line_number
-            brace_count = 1
-            for i, line in enumerate(self.lines[line_number:], line_number+1):
-                if '{' in line:
-                    brace_count += line.count('{')
-                if '}' in line:
-                    brace_count -= line.count('}')
-                    if brace_count == 0:
-                        end_line = i
-                        break
+    Args:
+        file_path: Path to the file to parse
+        engine: Python parsing engine ('astroid' or 'ast'); ignored for
+            other languages. Defaults to 'astroid'.
+        code: Source text to parse instead of reading the file; the
+            extension of file_path still selects the parser
+        language: Language name (see LANGUAGES) selecting the parser
+            instead of the extension
+    """
+    if language is not None:
+        if language not in LANGUAGES:
+            raise ValueError(f"Unsupported language: {language}")
+        file_ext = LANGUAGES[language]
+    else:
+        file_ext = os.path.splitext(file_path)[1].lower()
+    entry = PARSERS_BY_EXTENSION.get(file_ext)
+    if entry is None:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+    module_name, class_name = entry
+    parser_class = getattr(importlib.import_module('.' + module_name, __package__), class_name)
+    if engine and class_name == 'PythonParser':
+        return parser_class(file_path, engine, code=code)
+    return parser_class(file_path, code=code)
+
+
+def _load_replacement(replacement_file, replacement_content):
+    """Return the replacement text of an edit, reading it from a file if given."""
+    if replacement_file:
+        with open(replacement_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    return replacement_content
+
+
+def _parse_line_range(element_name):
+    """Parse a 'start-end' (or single line) range; returns (start, end) or None."""
+    try:
+        parts = element_name.split('-')
+        start_line = int(parts[0])
+        end_line = int(parts[1]) if len(parts) > 1 else start_line
+    except ValueError:
+        return None
+    return start_line, end_line
+
+
+def _locate_edit(target_file, target_lines, element_type, element_name, get_results):
+    """
+    Resolve an edit target to a line range of the original file.
+    
+    Args:
+        get_results: Callable returning the parsed results of the target
+            (only called for named elements)
             
-            classes.append({
-                'name': class_name,
-                'line_start': line_number,
-                'line_end': end_line,
-                'methods': [],  # Methods would need detailed parsing
-                'source_code': '\n'.join(self.lines[line_number-1:end_line])
-            })
-        
-        # Parse interfaces
-        interface_pattern = r'interface\s+(\w+)(?:\s+extends\s+\w+)?\s*\{'
-        interface_matches = re.finditer(interface_pattern, self.code)
-        
-        for match in interface_matches:
-            interface_name = match.group(1)
-            line_number = self.code[:match.start()].count('\n') + 1
+    Returns:
+        Tuple of (start_line, end_line, error_message); the range is None
+        when the target cannot be resolved
+    """
+    if element_type == 'lines':
+        line_range = _parse_line_range(element_name)
+        if line_range is None:
+            return None, None, f"Invalid line range format: {element_name}. Use 'start-end'."
+        start_line, end_line = line_range
+        if start_line < 1 or end_line < start_line or start_line > len(target_lines):
+            return None, None, f"Line range {element_name} is outside of {target_file}"
+        return start_line, end_line, None
+    
+    if element_type not in ('function', 'class'):
+        return None, None, f"Unsupported element type: {element_type}"
+    
+    # Find the element by plain or qualified name
+    matches = find_elements(get_results(), element_name, element_type)
+    if not matches:
+        return None, None, f"{element_type.capitalize()} '{element_name}' not found in {target_file}"
+    return matches[0]['line_start'], matches[0]['line_end'], None
+
+
+def _indent_replacement(replacement_content, original_indent):
+    """Re-indent replacement content so its least indented line starts at original_indent."""
+    replacement_lines = replacement_content.splitlines()
+    if not replacement_lines:
+        return replacement_content
+    
+    # Identify the base indentation of the replacement content
+    # by finding the non-empty line with the least indentation
+    replace_indent = None
+    for line in replacement_lines:
+        if line.strip():  # Skip empty lines
+            current_indent = len(line) - len(line.lstrip())
+            if replace_indent is None or current_indent < replace_indent:
+                replace_indent = current_indent
+    
+    # If no indent was found, default to 0
+    if replace_indent is None:
+        replace_indent = 0
+        
+    # Apply the target indentation to all lines
+    adjusted_lines = []
+    for line in replacement_lines:
+        if line.strip():  # If not an empty line
+            # Remove the original indent and add the new one
+            if len(line) > replace_indent:
+                line_content = line[replace_indent:]
+                adjusted_lines.append(f"{original_indent}{line_content}")
+            else:
+                adjusted_lines.append(f"{original_indent}{line.lstrip()}")
+        else:
+            # For empty lines, just add the original indent if there was one
+            if original_indent:
+                adjusted_lines.append(original_indent)
+            else:
+                adjusted_lines.append("")
+                
+    return "\n".join(adjusted_lines)
+
+
+def _splice_lines(target_lines, replacements):
+    """
+    Apply non-overlapping line-range replacements in one pass.
+    
+    Args:
+        target_lines: Lines of the original file (with line endings)
+        replacements: List of (start_line, end_line, content) in original
+            coordinates, sorted by start_line
             
-            # Find the end of the interface
-            end_line = line_number
-            brace_count = 1
-            for i, line in enumerate(self.lines[line_number:], line_number+1):
-                if '{' in line:
-                    brace_count += line.count('{')
-                if '}' in line:
-                    brace_count -= line.count('}')
-                    if brace_count == 0:
-                        end_line = i
-                        break
+    Returns:
+        The new file content as a string
+    """
+    new_content = []
+    position = 0
+    for start_line, end_line, content in replacements:
+        new_content.extend(target_lines[position:start_line - 1])
+        new_content.append(content)
+        if not content.endswith('\n'):
+            new_content.append('\n')
+        # Skip all lines of the original element
+        position = max(position, end_line)
+    new_content.extend(target_lines[position:])
+    return ''.join(new_content)
+
+
+def atomic_write(file_path, content):
+    """
+    Replace a file's content via a temporary file and rename, so it is never
+    half-written. Symlinks are written through and the file's mode is kept.
+    """
+    # Imported here so that read-only runs do not pay for them at startup
+    import shutil
+    import tempfile
+    
+    # Write through symlinks: replacing the link itself would leave its target unedited
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _describe_edit(edit):
+    """Short label for an edit, used in batch error messages."""
+    return f"{edit.get('element_type')} '{edit.get('element_name')}'"
+
+
+class EditError(ValueError):
+    """Raised when an edit cannot be resolved against its target, or edits overlap."""
+
+
+def render_edits(target_file, edits, engine=None):
+    """
+    Resolve edits against a file and return its content with them applied,
+    without writing anything.
+    
+    All edits are resolved against the original file, so line numbers and
+    names refer to the file as it was before any of them is applied. The
+    file is parsed at most once, and only for the element kinds the edits
+    name.
+    
+    Args:
+        target_file: Path to the file to edit
+        edits: List of dictionaries as for replace_elements(); an edit with
+            a true 'optional' key is skipped if its element is not found
+        engine: Python parsing engine ('astroid' or 'ast')
+        
+    Returns:
+        Tuple of (original content, new content, number of edits applied)
+        
+    Raises:
+        EditError: If an edit cannot be resolved or two edits overlap
+    """
+    # Read target file
+    with open(target_file, 'r', encoding='utf-8') as f:
+        target_lines = f.readlines()
+    
+    results = []
+    def get_results():
+        # Parse the target at most once, only if an edit names an element,
+        # and only for the element kinds the edits name
+        if not results:
+            want = {ELEMENT_TYPE_KINDS[edit.get('element_type')] for edit in edits
+                    if edit.get('element_type') in ('function', 'class')}
+            results.append(extract_code_elements(target_file, engine=engine, want=want, records=True))
+        return results[0]
+    
+    replacements = []
+    for number, edit in enumerate(edits, 1):
+        label = f"Edit {number} ({_describe_edit(edit)})"
+        if not edit.get('replacement_file') and not edit.get('replacement_content'):
+            raise EditError(f"{label}: Either replacement_file or replacement_content must be provided")
+        if (edit.get('optional') and edit.get('element_type') in ('function', 'class') and
+                not find_elements(get_results(), str(edit.get('element_name')), edit['element_type'])):
+            continue
+        replacement_content = _load_replacement(edit.get('replacement_file'), edit.get('replacement_content'))
+        
+        start_line, end_line, error = _locate_edit(
+            target_file, target_lines, edit.get('element_type'), str(edit.get('element_name')), get_results)
+        if error:
+            raise EditError(f"{label}: {error}")
+        
+        # Calculate indentation of the first line
+        line = target_lines[start_line - 1] if start_line <= len(target_lines) else ""
+        original_indent = line[:len(line) - len(line.lstrip())]
+        replacements.append((start_line, end_line, _indent_replacement(replacement_content, original_indent), label))
+    
+    replacements.sort(key=lambda replacement: replacement[0])
+    for previous, current in zip(replacements, replacements[1:]):
+        if current[0] <= previous[1]:
+            raise EditError(f"{current[3]} overlaps {previous[3]}")
+    
+    new_content = _splice_lines(target_lines, [replacement[:3] for replacement in replacements])
+    return ''.join(target_lines), new_content, len(replacements)
+
+
+def replace_elements(target_file, edits, engine=None):
+    """
+    Apply several replacements to a file with a single parse and a single write.
+    
+    All edits are resolved against the original file, so line numbers and
+    names refer to the file as it was before any of them is applied. Either
+    every edit is applied or, if any of them fails to resolve or two of them
+    overlap, the file is left untouched.
+    
+    Args:
+        target_file: Path to the file where replacements will occur
+        edits: List of dictionaries with the keys of replace_element():
+            'element_type' ('function', 'class' or 'lines'), 'element_name',
+            and 'replacement_file' or 'replacement_content', plus an
+            optional 'optional' flag (see render_edits)
+        engine: Python parsing engine ('astroid' or 'ast')
             
-            interfaces.append({
-                'name': interface_name,
-                'line_start': line_number,
-                'line_end': end_line,
-                'source_code': '\n'.join(self.lines[line_number-1:end_line])
-            })
-        
-        return {
-            'functions': functions,
-            'classes': classes,
-            'interfaces': interfaces,
-            'decorators': [],
-            'print_calls': [],
-        }
+    Returns:
+        Tuple of (success, message)
+    """
+    try:
+        _, new_content, applied = render_edits(target_file, edits, engine)
+        atomic_write(target_file, new_content)
+        
+        message = f"Successfully applied {applied} edit(s) to {target_file}"
+        skipped = len(edits) - applied
+        if skipped:
+            message += f" (skipped {skipped} optional edit(s) whose element was not found)"
+        return True, message
+        
+    except EditError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Error applying edits: {str(e)}"
+
 
 def replace_element(target_file, element_type, element_name, replacement_file=None, replacement_content=None):
     """
@@ -430,118 +1254,27 @@ def replace_element(target_file, element_type, element_name, replacement_file=No
             target_lines = f.readlines()
         
         # Read replacement content
-        if replacement_file:
-            with open(replacement_file, 'r', encoding='utf-8') as f:
-                replacement_content = f.read()
+        replacement_content = _load_replacement(replacement_file, replacement_content)
         
         # Get element to replace
-        start_line = None
-        end_line = None
-        
-        if element_type == 'lines':
-            try:
-                parts = element_name.split('-')
-                start_line = int(parts[0])
-                end_line = int(parts[1]) if len(parts) > 1 else start_line
-            except ValueError:
-                return False, f"Invalid line range format: {element_name}. Use 'start-end'."
-        else:
-            # Analyze the file to find the element
-            results = analyze_file(target_file)['raw_results']
-            
-            if element_type == 'function':
-                element_list = results['functions']
-                # Also check class methods
-                if not any(f['name'] == element_name for f in element_list):
-                    for cls in results['classes']:
-                        for method in cls.get('methods', []):
-                            if method['name'] == element_name:
-                                start_line = method['line_start']
-                                end_line = method['line_end']
-                                break
-                        if start_line:
-                            break
-            elif element_type == 'class':
-                element_list = results['classes']
-            else:
-                return False, f"Unsupported element type: {element_type}"
-                
-            # If we haven't found a method, look for the main element
-            if not start_line:
-                for element in element_list:
-                    if element['name'] == element_name:
-                        start_line = element['line_start']
-                        end_line = element['line_end']
-                        break
-                        
-            if not start_line:
-                return False, f"{element_type.capitalize()} '{element_name}' not found in {target_file}"
+        start_line, end_line, error = _locate_edit(
+            target_file, target_lines, element_type, element_name,
+            lambda: extract_code_elements(target_file, records=True))
+        if error:
+            return False, error
         
         # Calculate indentation of the first line
-        original_indent = ""
-        if start_line and start_line <= len(target_lines):
-            line = target_lines[start_line - 1]
-            original_indent = line[:len(line) - len(line.lstrip())]
+        line = target_lines[start_line - 1]
+        original_indent = line[:len(line) - len(line.lstrip())]
         
         # Process the replacement content to match indentation
-        replacement_lines = replacement_content.splitlines()
-        if replacement_lines:
-            # Identify the base indentation of the replacement content
-            # by finding the non-empty line with the least indentation
-            replace_indent = None
-            for line in replacement_lines:
-                if line.strip():  # Skip empty lines
-                    current_indent = len(line) - len(line.lstrip())
-                    if replace_indent is None or current_indent < replace_indent:
-                        replace_indent = current_indent
-            
-            # If no indent was found, default to 0
-            if replace_indent is None:
-                replace_indent = 0
-                
-            # Apply the target indentation to all lines
-            adjusted_lines = []
-            for line in replacement_lines:
-                if line.strip():  # If not an empty line
-                    # Remove the original indent and add the new one
-                    if len(line) > replace_indent:
-                        line_content = line[replace_indent:]
-                        adjusted_lines.append(f"{original_indent}{line_content}")
-                    else:
-                        adjusted_lines.append(f"{original_indent}{line.lstrip()}")
-                else:
-                    # For empty lines, just add the original indent if there was one
-                    if original_indent:
-                        adjusted_lines.append(original_indent)
-                    else:
-                        adjusted_lines.append("")
-                        
-            replacement_content = "\n".join(adjusted_lines)
-        
-        # Perform the replacement
-        new_content = []
-        i = 0
-        while i < len(target_lines):
-            line_num = i + 1
-            if line_num < start_line or line_num > end_line:
-                new_content.append(target_lines[i])
-                i += 1
-            elif line_num == start_line:
-                # Add the replacement content
-                new_content.append(replacement_content)
-                if not replacement_content.endswith('\n'):
-                    new_content.append('\n')
-                # Skip all lines of the original element
-                i = end_line
-            else:
-                i += 1
+        replacement_content = _indent_replacement(replacement_content, original_indent)
         
-        # Write the modified content back to the file
-        with open(target_file, 'w', encoding='utf-8') as f:
-            for line in new_content:
-                f.write(line if isinstance(line, str) else '')
+        # Perform the replacement and write the file atomically
+        new_content = _splice_lines(target_lines, [(start_line, end_line, replacement_content)])
+        atomic_write(target_file, new_content)
         
         return True, f"Successfully replaced {element_type} '{element_name}' in {target_file}"
         
     except Exception as e:
-        return False, f"Error replacing {element_type}: {str(e)}"
\ No newline at end of file
+        return False, f"Error replacing {element_type}: {str(e)}"
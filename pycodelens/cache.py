@@ -0,0 +1,164 @@
+"""
+Persistent on-disk cache of extraction results for PyCodeLens.
+
+Entries are keyed by the file content hash, the parser that produced them,
+the PyCodeLens version and the cache format, so an entry never needs to be invalidated: a
+changed file simply maps to a different key. The cache directory is kept
+below a size limit by evicting the least recently used entries.
+"""
+
+import os
+import json
+
+from . import __version__
+
+DEFAULT_CACHE_DIR = '.pycodelens_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bumped whenever the layout of cached results changes, so that entries
+# written in the old layout are never read back, even within one version
+CACHE_FORMAT = 1
+
+# When the size limit is exceeded, entries are evicted down to this fraction
+# of it so that eviction does not run again on the very next write.
+EVICTION_TARGET = 0.8
+
+
+class ResultCache:
+    """Content-addressed store for extract_elements() results."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._total_bytes = None
+
+    def key_for(self, parser):
+        """Compute the cache key for the file loaded by a parser."""
+        # Imported here (like tempfile in put()) so that runs without a
+        # cache do not pay for it at startup
+        import hashlib
+
+        parser_id = type(parser).__name__
+        if getattr(parser, 'engine', None):
+            parser_id += ':' + parser.engine
+        digest = hashlib.sha256()
+        digest.update(f"{__version__}\0{CACHE_FORMAT}\0{parser_id}\0".encode('utf-8'))
+        digest.update(parser.source.encoded())
+        return digest.hexdigest()
+
+    def _path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def get(self, key):
+        """
+        Look up cached results.
+
+        Args:
+            key: Key from key_for()
+
+        Returns:
+            Results dictionary, or None on a miss
+        """
+        path = self._path_for(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Refresh the modification time so eviction is least-recently-used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return results
+
+    def put(self, key, results):
+        """
+        Store results, evicting old entries if the cache grows too large.
+
+        Args:
+            key: Key from key_for()
+            results: Results from a parser's extract_elements()
+        """
+        import tempfile
+
+        entry = {k: v for k, v in results.items() if not k.startswith('_')}
+        data = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+
+        path = self._path_for(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # A read-only or full cache directory must never break analysis
+            return
+
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every entry in the cache."""
+        try:
+            subdirs = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for subdir in subdirs:
+            subdir_path = os.path.join(self.cache_dir, subdir)
+            try:
+                names = os.listdir(subdir_path)
+            except OSError:
+                continue
+            for name in names:
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(subdir_path, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict(self):
+        """Delete least recently used entries until under the size target."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for path, _, _ in list(self._entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._total_bytes = 0
+
+
+_open_caches = {}
+
+
+def get_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+    """Return a shared ResultCache for a directory, creating it on first use."""
+    key = (os.path.abspath(cache_dir), max_bytes)
+    cache = _open_caches.get(key)
+    if cache is None:
+        cache = _open_caches[key] = ResultCache(cache_dir, max_bytes)
+    return cache
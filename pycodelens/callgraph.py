@@ -0,0 +1,214 @@
+"""
+Cross-file call graph of Python code for PyCodeLens.
+
+Every Python file below a directory is parsed in a pool of worker processes
+into its definitions and caller -> callee edges (see
+PythonParser.extract_calls), and the per-file graphs are merged into one
+CallGraph that answers "who calls X" and "what does X call" and can be
+exported as JSON or Graphviz DOT.
+
+Names are interned to integers and edges are kept as tuples of integers,
+so graphs of repositories with hundreds of thousands of functions stay
+compact.
+"""
+
+import os
+import json
+
+from .scanner import DEFAULT_EXCLUDE_DIRS, iter_source_files, pool_map
+
+
+# Directory -> whether it contains an __init__.py, shared by all files of a run
+_package_dirs = {}
+
+
+def module_name(file_path):
+    """
+    Dotted module name of a Python file.
+
+    Parent directories count as packages as long as they contain an
+    __init__.py, so the name is the one the module is imported by.
+    """
+    directory, filename = os.path.split(os.path.abspath(file_path))
+    stem = os.path.splitext(filename)[0]
+    parts = [] if stem == '__init__' else [stem]
+    while True:
+        is_package = _package_dirs.get(directory)
+        if is_package is None:
+            is_package = _package_dirs[directory] = os.path.isfile(os.path.join(directory, '__init__.py'))
+        if not is_package:
+            break
+        directory, package = os.path.split(directory)
+        parts.append(package)
+    return '.'.join(reversed(parts)) or stem
+
+
+def _file_graph(file_path):
+    """Extract one file's calls, capturing failures instead of raising."""
+    from .python_parser import PythonParser
+
+    try:
+        return file_path, PythonParser(file_path, engine='ast').extract_calls(module_name(file_path)), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+class CallGraph:
+    """
+    Caller -> callee edges between fully qualified names.
+
+    Nodes are the functions and classes defined in the analyzed files;
+    callees that are not defined there (builtins, third-party code, calls
+    that could not be resolved) appear only as edge targets.
+    """
+
+    def __init__(self):
+        self._names = []
+        self._ids = {}
+        self._files = []
+        # Name id -> (kind, file id, line_start, line_end)
+        self._definitions = {}
+        # Name id -> list of (other name id, file id, line), in both directions
+        self._callees = {}
+        self._callers = {}
+        # Last component of each name -> ids, for lookups by plain name
+        self._by_plain_name = {}
+        self.num_edges = 0
+        self.errors = []
+
+    def _intern(self, name):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self._names)
+            self._names.append(name)
+            self._by_plain_name.setdefault(name.rpartition('.')[2], []).append(name_id)
+        return name_id
+
+    def add_file(self, file_path, file_graph):
+        """Merge the graph of one file (as returned by PythonParser.extract_calls)."""
+        file_id = len(self._files)
+        self._files.append(file_path)
+        intern = self._intern
+        for name, kind, line_start, line_end in file_graph['definitions']:
+            self._definitions[intern(name)] = (kind, file_id, line_start, line_end)
+        for caller, callee, line in file_graph['calls']:
+            caller_id, callee_id = intern(caller), intern(callee)
+            self._callees.setdefault(caller_id, []).append((callee_id, file_id, line))
+            self._callers.setdefault(callee_id, []).append((caller_id, file_id, line))
+        self.num_edges += len(file_graph['calls'])
+
+    def __len__(self):
+        """Number of functions and classes defined in the graph's files."""
+        return len(self._definitions)
+
+    def resolve(self, name):
+        """
+        Return the names in the graph matching a plain, qualified or fully
+        qualified name: 'run', 'Widget.run' and 'pkg.mod.Widget.run' all
+        match 'pkg.mod.Widget.run'.
+        """
+        suffix = '.' + name
+        return [self._names[name_id] for name_id in self._by_plain_name.get(name.rpartition('.')[2], ())
+                if self._names[name_id] == name or self._names[name_id].endswith(suffix)]
+
+    def definition(self, name):
+        """Where a fully qualified name is defined, or None for names only called."""
+        definition = self._definitions.get(self._ids.get(name))
+        if definition is None:
+            return None
+        kind, file_id, line_start, line_end = definition
+        return {'name': name, 'kind': kind, 'file': self._files[file_id],
+                'line_start': line_start, 'line_end': line_end}
+
+    def _edges(self, index, name, outgoing):
+        edges = []
+        for full_name in self.resolve(name):
+            for other_id, file_id, line in index.get(self._ids[full_name], ()):
+                other = self._names[other_id]
+                caller, callee = (full_name, other) if outgoing else (other, full_name)
+                edges.append({'caller': caller, 'callee': callee, 'file': self._files[file_id], 'line': line})
+        return edges
+
+    def callers(self, name):
+        """Edges into the functions matching name (see resolve), as dictionaries."""
+        return self._edges(self._callers, name, outgoing=False)
+
+    def callees(self, name):
+        """Edges out of the functions matching name (see resolve), as dictionaries."""
+        return self._edges(self._callees, name, outgoing=True)
+
+    def iter_definitions(self):
+        """Yield the definition of every function and class (see definition)."""
+        for name_id in self._definitions:
+            yield self.definition(self._names[name_id])
+
+    def iter_edges(self):
+        """Yield every edge as a (caller, callee, file, line) tuple."""
+        names, files = self._names, self._files
+        for caller_id, edges in self._callees.items():
+            for callee_id, file_id, line in edges:
+                yield names[caller_id], names[callee_id], files[file_id], line
+
+    def write_json(self, stream):
+        """
+        Write the graph as one JSON object with 'nodes' (definitions) and
+        'edges' lists, one item at a time so large graphs are never held in
+        memory as a whole.
+        """
+        stream.write('{"nodes": [')
+        for i, definition in enumerate(self.iter_definitions()):
+            stream.write((',\n  ' if i else '\n  ') + json.dumps(definition))
+        stream.write('\n], "edges": [')
+        for i, (caller, callee, file_path, line) in enumerate(self.iter_edges()):
+            edge = {'caller': caller, 'callee': callee, 'file': file_path, 'line': line}
+            stream.write((',\n  ' if i else '\n  ') + json.dumps(edge))
+        stream.write('\n]}\n')
+
+    def write_dot(self, stream, defined_only=True):
+        """
+        Write the graph in Graphviz DOT format, one edge per caller/callee
+        pair.
+
+        Args:
+            stream: Text stream to write to
+            defined_only: Leave out callees not defined in the analyzed files
+        """
+        stream.write('digraph calls {\n')
+        for caller_id, edges in self._callees.items():
+            seen = set()
+            for callee_id, _, _ in edges:
+                if callee_id in seen or (defined_only and callee_id not in self._definitions):
+                    continue
+                seen.add(callee_id)
+                stream.write(f"  {json.dumps(self._names[caller_id])} -> {json.dumps(self._names[callee_id])};\n")
+        stream.write('}\n')
+
+    def stats(self):
+        """Counts of files, definitions, edges and files that failed to parse."""
+        return {'files': len(self._files), 'definitions': len(self._definitions),
+                'edges': self.num_edges, 'errors': len(self.errors)}
+
+
+def build_call_graph(root, workers=None, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Build the call graph of every Python file below a directory.
+
+    Args:
+        root: Directory (or single Python file) to analyze
+        workers: Worker processes (defaults to the CPU count; 0 or 1 builds
+            in the current process)
+        exclude_dirs: Directory names to skip while walking
+
+    Returns:
+        CallGraph; files that could not be parsed are listed in its
+        'errors' attribute as (file, message) tuples
+    """
+    files = [file_path for file_path in iter_source_files(root, exclude_dirs) if file_path.endswith('.py')]
+    graph = CallGraph()
+    # In order, so that graphs built with any number of workers are identical
+    for file_path, file_graph, error in pool_map(_file_graph, files, workers, ordered=True):
+        if error is not None:
+            graph.errors.append((file_path, error))
+        else:
+            graph.add_file(file_path, file_graph)
+    return graph
@@ -7,7 +7,13 @@ import sys
 import os
 import argparse
 import json
-from .analyzer import analyze_file, extract_code_elements, get_source_by_name, get_source_by_lines, replace_element
+from . import profiling
+from .analyzer import (ELEMENT_TYPE_KINDS, LANGUAGES, PYTHON_ENGINES, SourceBuffer, analyze_file,
+                       analyze_source, extract_code_elements, find_elements_matching,
+                       is_glob_pattern, json_default, read_line_ranges, replace_element, replace_elements, without_source)
+from .cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, get_cache
+from .scanner import analyze_tree
+from .watch import DEFAULT_INTERVAL, watch
 
 def print_functions(functions, verbose=False):
     """Print function information."""
@@ -55,41 +61,392 @@ def print_source_code(source_code, element_name=None, element_type=None):
     
     print(f"{source_code}")
 
-def main():
-    """Main CLI entry point."""
-    parser = argparse.ArgumentParser(
-        description='PyCodeLens: Extract and analyze code elements from various programming files'
-    )
-    parser.add_argument('file', help='Path to the file')
-    parser.add_argument('--functions', '-f', action='store_true', help='List functions')
-    parser.add_argument('--decorators', '-d', action='store_true', help='List decorators')
-    parser.add_argument('--classes', '-c', action='store_true', help='List classes')
-    parser.add_argument('--prints', '-p', action='store_true', help='List print statements')
-    parser.add_argument('--counts', '-n', action='store_true', help='Show only counts')
-    parser.add_argument('--all', '-a', action='store_true', help='Show all information')
-    parser.add_argument('--json', '-j', action='store_true', help='Output in JSON format')
-    parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed information')
+def warn_if_ambiguous(matches, name, element_type):
+    """Tell the user when a name matches several elements and only the first is shown."""
+    if len(matches) > 1:
+        first = matches[0]
+        candidates = ', '.join(f"{m.get('qualname', m['name'])} (line {m['line_start']})" for m in matches)
+        print(f"Note: {len(matches)} {element_type}s match '{name}'; showing lines "
+              f"{first['line_start']}-{first['line_end']}. Matches: {candidates}", file=sys.stderr)
+
+# Path argument that reads the code from stdin, and the name it is reported under
+STDIN_PATH = '-'
+STDIN_NAME = '<stdin>'
+
+def snippet_file_name(element, extension, used):
+    """File name of a snippet written by --output-dir, unique among the names in used."""
+    name = element.get('qualname', element['name'])
+    file_name = name + extension
+    if file_name in used:
+        # Elements sharing a qualified name, such as overloads
+        file_name = f"{name}-{element['line_start']}{extension}"
+    used.add(file_name)
+    return file_name
+
+def output_sources(args, queries, found):
+    """
+    Print the sources found for --function-name and --class-name, as text or
+    JSON, or write them to files in --output-dir.
     
-    # Code retrieval arguments
-    parser.add_argument('--function-name', type=str, help='Print source code of a function by name')
-    parser.add_argument('--class-name', type=str, help='Print source code of a class by name')
-    parser.add_argument('--lines', type=str, help='Print lines from the file (format: start-end)')
+    A plain or qualified name selects its first match (with a note if it is
+    ambiguous); a glob pattern selects all of its matches.
+    """
+    structured = args.json or args.output_dir
+    selected = []
+    seen = set()
+    not_found = []
+    for (element_type, pattern), matches in zip(queries, found):
+        if not matches:
+            not_found.append({'type': element_type, 'pattern': pattern})
+            print(f"{element_type.capitalize()} '{pattern}' not found.",
+                  file=sys.stderr if structured else sys.stdout)
+            continue
+        if not is_glob_pattern(pattern):
+            warn_if_ambiguous(matches, pattern, element_type)
+            matches = matches[:1]
+        for match in matches:
+            identity = (element_type, match.get('qualname', match['name']), match['line_start'])
+            if identity not in seen:
+                seen.add(identity)
+                selected.append((element_type, pattern, match))
+
+    if not structured:
+        for element_type, pattern, match in selected:
+            # Plain names are shown as given, glob matches by their qualified name
+            label = match.get('qualname', match['name']) if is_glob_pattern(pattern) else pattern
+            print_source_code(match['source_code'], label, element_type)
+        return
+
+    records = []
+    for element_type, pattern, match in selected:
+        records.append({
+            'type': element_type,
+            'pattern': pattern,
+            'name': match['name'],
+            'qualname': match.get('qualname', match['name']),
+            'line_start': match['line_start'],
+            'line_end': match['line_end'],
+            'source_code': match['source_code'],
+        })
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        extension = os.path.splitext(args.file)[1] or LANGUAGES.get(args.lang, '')
+        used = set()
+        for record in records:
+            record['snippet'] = os.path.join(args.output_dir, snippet_file_name(record, extension, used))
+            with open(record['snippet'], 'w', encoding='utf-8') as f:
+                f.write(record['source_code'] + '\n')
+    if args.json:
+        print(json.dumps({'file': args.file, 'matches': records, 'not_found': not_found}, indent=2))
+    else:
+        for record in records:
+            print(record['snippet'])
+        print(f"Wrote {len(records)} snippets to {args.output_dir}", file=sys.stderr)
+
+class LocalBackend:
+    """
+    Runs single-file requests in this process (the counterpart of DaemonClient).
     
-    # Code replacement arguments
-    replacement_group = parser.add_argument_group('Code Replacement Options')
-    replacement_group.add_argument('--replace-function', type=str, help='Name of the function to replace')
-    replacement_group.add_argument('--replace-class', type=str, help='Name of the class to replace')
-    replacement_group.add_argument('--replace-lines', type=str, help='Line range to replace (format: start-end)')
-    replacement_group.add_argument('--replacement-file', type=str, help='File containing the replacement code')
-    replacement_group.add_argument('--replacement-content', type=str, help='Directly specified replacement code')
+    With code given (such as read from stdin), requests analyze it in the
+    given language instead of reading the file.
+    """
+
+    def __init__(self, cache=None, engine=None, code=None, language=None):
+        self.cache = cache
+        self.engine = engine
+        self.code = code
+        self.language = language
+
+    def analyze(self, file_path, include_source=True, want=None, summary=True):
+        if self.code is not None:
+            return analyze_source(self.code, self.language, file_path, self.engine, want, summary, records=True)
+        return analyze_file(file_path, self.cache, self.engine, want, summary, records=True)
+
+    def find_sources(self, file_path, queries):
+        """Find the elements matching (element_type, name or glob) queries, from a single parse."""
+        want = {ELEMENT_TYPE_KINDS.get(element_type, 'functions') for element_type, _ in queries}
+        results = extract_code_elements(file_path, self.cache, self.engine, want, self.code, self.language,
+                                        records=True)
+        patterns = {}
+        for element_type, pattern in queries:
+            patterns.setdefault(element_type, []).append(pattern)
+        found = {element_type: find_elements_matching(results, type_patterns, element_type)
+                 for element_type, type_patterns in patterns.items()}
+        return [found[element_type][pattern] for element_type, pattern in queries]
+
+    def sources_by_lines(self, file_path, ranges):
+        # Lines are read straight from the file (or code), without parsing
+        if self.code is not None:
+            source = SourceBuffer(self.code)
+            return [source.get_lines(start_line, end_line) for start_line, end_line in ranges]
+        return read_line_ranges(file_path, ranges)
+
+    def replace_element(self, file_path, element_type, element_name,
+                        replacement_file=None, replacement_content=None):
+        return replace_element(file_path, element_type, element_name,
+                               replacement_file, replacement_content)
+
+    def replace_elements(self, file_path, edits):
+        return replace_elements(file_path, edits)
+
+def connect_backend(args, cache):
+    """Return the daemon client if --use-daemon is set and a daemon is running, else a LocalBackend."""
+    if args.use_daemon:
+        # Imported here: the socket modules are only needed in daemon mode
+        from .daemon import DaemonClient, DaemonUnavailable
+        client = DaemonClient(args.socket, args.engine)
+        try:
+            return client.connect()
+        except DaemonUnavailable as e:
+            print(f"Note: {e}; analyzing in-process.", file=sys.stderr)
+    return LocalBackend(cache, args.engine)
+
+def wanted_kinds(args):
+    """Return the element kinds the output options need, or None if they need all of them."""
+    listings = (('functions', args.functions), ('decorators', args.decorators),
+                ('classes', args.classes), ('print_calls', args.prints))
+    if args.json or args.jsonl or args.counts or args.all or not any(flag for _, flag in listings):
+        return None
+    return {kind for kind, flag in listings if flag}
+
+def needs_summary(args):
+    """Whether the output includes the analysis summary (only full JSON and JSON Lines file records do)."""
+    return not args.counts and (args.json or args.jsonl == 'file')
+
+def count_elements(file_path, results):
+    """Build the element count record used by --counts --json."""
+    return {
+        'file': file_path,
+        'functions': len(results['functions']),
+        'decorators': len(results.get('decorators', [])),
+        'classes': len(results['classes']),
+        'print_statements': len(results.get('print_calls', []))
+    }
+
+def json_ready(analysis):
+    """Return a copy of an analysis without its private (non-serializable) entries."""
+    raw_results = {k: v for k, v in analysis['raw_results'].items() if not k.startswith('_')}
+    return dict(analysis, raw_results=raw_results)
+
+def print_analysis(args, file_path, results):
+    """Print the requested sections of an analysis in text form."""
+    show_counts = args.counts
+    # Default to showing counts if no specific options
+    if not (args.functions or args.decorators or args.classes or args.prints) and not args.all:
+        show_counts = True
+
+    # Show counts
+    if show_counts:
+        print(f"File: {file_path}")
+        print(f"  Functions: {len(results['functions'])}")
+        print(f"  Decorators: {len(results.get('decorators', []))}")
+        print(f"  Classes: {len(results['classes'])}")
+        print(f"  Print statements: {len(results.get('print_calls', []))}")
+
+    # Show detailed information
+    if args.functions or args.all:
+        print_functions(results['functions'], args.verbose)
+
+    if args.decorators or args.all:
+        print_decorators(results.get('decorators', []))
+
+    if args.classes or args.all:
+        print_classes(results['classes'], args.verbose)
+
+    if args.prints or args.all:
+        print_prints(results.get('print_calls', []))
+
+# Element lists of the raw results and the record type used for them in JSON Lines output
+JSONL_ELEMENT_TYPES = (
+    ('functions', 'function'),
+    ('classes', 'class'),
+    ('interfaces', 'interface'),
+    ('decorators', 'decorator'),
+    ('print_calls', 'print_call'),
+)
+
+def iter_jsonl_records(file_path, analysis, granularity='file', include_source=False, counts=False):
+    """
+    Build the JSON Lines records for one analyzed file.
+    
+    Args:
+        file_path: Path of the analyzed file
+        analysis: Result of analyze_file
+        granularity: 'file' for one record per file, 'element' for one
+            record per function, method, class, interface, decorator and
+            print call
+        include_source: Whether element records include their source code
+        counts: Emit only the element counts of the file
+        
+    Yields:
+        JSON-serializable dictionaries
+    """
+    results = analysis['raw_results']
+    if counts:
+        yield dict({'type': 'counts'}, **count_elements(file_path, results))
+        return
     
-    args = parser.parse_args()
+    convert = (lambda value: value) if include_source else without_source
+    if granularity == 'file':
+        record = {'type': 'file', 'file': file_path, 'summary': analysis['summary']}
+        for key, value in results.items():
+            if not key.startswith('_'):
+                record[key] = convert(value)
+        yield record
+        return
     
+    for key, record_type in JSONL_ELEMENT_TYPES:
+        for element in results.get(key, []):
+            record = {'type': record_type, 'file': file_path}
+            record.update(convert(element))
+            if record_type == 'class':
+                methods = record.pop('methods', [])
+                yield record
+                for method in methods:
+                    yield dict(type='method', file=file_path, **{'class': element['name']}, **method)
+            else:
+                yield record
+
+def write_jsonl(records, stream=None):
+    """Write records as compact JSON, one per line, and flush them."""
+    stream = stream or sys.stdout
+    with profiling.phase('serialize'):
+        for record in records:
+            stream.write(json.dumps(record, separators=(',', ':'), default=json_default))
+            stream.write('\n')
+        stream.flush()
+
+def analyze_directory(args):
+    """Analyze every supported file below a directory (directory mode)."""
+    import time
+
+    failures = 0
+    json_results = []
+    # Files that were not analyzed, for --report
+    problems = {'error': [], 'skipped': [], 'timeout': []}
+    max_file_size = None
+    if args.max_file_size is not None:
+        max_file_size = int(args.max_file_size * 1024 * 1024)
+    start = time.perf_counter()
+    results_iter = analyze_tree(args.file, workers=args.workers,
+                                cache_dir=args.cache_dir, cache_max_bytes=args.cache_max_bytes,
+                                engine=args.engine, want=wanted_kinds(args), summary=needs_summary(args),
+                                max_file_size=max_file_size, timeout=args.timeout, records=True)
+    num_files = 0
+    for result in results_iter:
+        num_files += 1
+        if result['status'] != 'ok':
+            record = {key: value for key, value in result.items() if key != 'status'}
+            problems[result['status']].append(record)
+            if result['status'] == 'skipped':
+                print(f"Skipped {result['file']}: {result['error']}", file=sys.stderr)
+            else:
+                failures += 1
+                print(f"Error analyzing {result['file']}: {result['error']}", file=sys.stderr)
+            if args.jsonl:
+                write_jsonl([dict({'type': result['status']}, **record)])
+            continue
+
+        analysis = result['analysis']
+        if args.jsonl:
+            write_jsonl(iter_jsonl_records(result['file'], analysis, args.jsonl,
+                                           args.include_source, args.counts))
+        elif args.json:
+            if args.counts:
+                json_results.append(count_elements(result['file'], analysis['raw_results']))
+            else:
+                json_results.append(json_ready(analysis))
+        else:
+            with profiling.phase('output'):
+                print_analysis(args, result['file'], analysis['raw_results'])
+                sys.stdout.flush()
+
+    if args.json:
+        with profiling.phase('serialize'):
+            print(json.dumps(json_results, indent=2, default=json_default))
+    if args.report:
+        for records in problems.values():
+            records.sort(key=lambda record: record['file'])
+        report = {'files': num_files, 'seconds': round(time.perf_counter() - start, 3),
+                  'max_file_size': max_file_size, 'timeout': args.timeout,
+                  'analyzed': num_files - sum(len(records) for records in problems.values()),
+                  'errors': problems['error'], 'skipped': problems['skipped'], 'timeouts': problems['timeout']}
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if failures else 0
+
+def print_delta(event):
+    """Print one watch-mode or diff event in text form."""
+    if event['status'] == 'error':
+        print(f"{event['file']}: error: {event['error']}")
+        return
+    if event['status'] == 'renamed':
+        print(f"{event['file']} (renamed from {event['old_file']}):")
+    else:
+        print(f"{event['file']} ({event['status']}):")
+    for record in event['added']:
+        print(f"  + {record['type']} {record['qualname']} (lines {record['line_start']}-{record['line_end']})")
+    for record in event['removed']:
+        print(f"  - {record['type']} {record['qualname']} (lines {record['line_start']}-{record['line_end']})")
+    for record in event['moved']:
+        print(f"  ~ {record['type']} {record['qualname']} (lines {record['old_line_start']}-{record['old_line_end']}"
+              f" -> {record['line_start']}-{record['line_end']})")
+    for record in event.get('modified', ()):
+        print(f"  * {record['type']} {record['qualname']} (lines {record['old_line_start']}-{record['old_line_end']}"
+              f" -> {record['line_start']}-{record['line_end']})")
+
+def watch_path(args, cache):
+    """Re-analyze files as they change and print per-file deltas (watch mode)."""
+    print(f"Watching {args.file} (polling every {args.interval:g}s, Ctrl-C to stop)", file=sys.stderr)
     try:
-        if not os.path.exists(args.file):
+        for event in watch(args.file, args.interval, args.engine, cache, initial=args.initial):
+            if args.jsonl or args.json:
+                record_type = 'error' if event['status'] == 'error' else 'delta'
+                write_jsonl([dict({'type': record_type}, **event)])
+            else:
+                print_delta(event)
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def run(args, cache):
+    """Carry out the action selected by the parsed command-line arguments."""
+    try:
+        if args.file == STDIN_PATH:
+            if not args.lang:
+                print("Error: --lang is required when reading code from stdin.", file=sys.stderr)
+                return 1
+            if args.watch or args.edits or args.replace_function or args.replace_class or args.replace_lines:
+                print("Error: Code read from stdin can only be analyzed, not watched or edited.", file=sys.stderr)
+                return 1
+        elif not os.path.exists(args.file):
             print(f"Error: File '{args.file}' not found.", file=sys.stderr)
             return 1
-        
+
+        if args.watch:
+            return watch_path(args, cache)
+
+        if os.path.isdir(args.file):
+            return analyze_directory(args)
+
+        if args.file == STDIN_PATH:
+            args.file = STDIN_NAME
+            backend = LocalBackend(cache, args.engine, sys.stdin.read(), args.lang)
+        else:
+            backend = connect_backend(args, cache)
+
+        # Handle batch code replacement
+        if args.edits:
+            with open(args.edits, 'r', encoding='utf-8') as f:
+                edits = json.load(f)
+            success, message = backend.replace_elements(args.file, edits)
+            if success:
+                print(message)
+                return 0
+            print(f"Error: {message}", file=sys.stderr)
+            return 1
+
         # Handle code replacement
         if args.replace_function or args.replace_class or args.replace_lines:
             if not (args.replacement_file or args.replacement_content):
@@ -106,7 +463,7 @@ def main():
                 element_type = 'lines'
                 element_name = args.replace_lines
                 
-            success, message = replace_element(
+            success, message = backend.replace_element(
                 args.file,
                 element_type,
                 element_name,
@@ -121,90 +478,459 @@ def main():
                 print(f"Error: {message}", file=sys.stderr)
                 return 1
                 
-        # Source code retrieval
-        if args.function_name:
-            analysis = analyze_file(args.file)
-            results = analysis['raw_results']
-            source = get_source_by_name(results, args.function_name, 'function')
-            if source:
-                print_source_code(source, args.function_name, 'function')
-            else:
-                print(f"Function '{args.function_name}' not found.")
-            return 0
-            
-        if args.class_name:
-            analysis = analyze_file(args.file)
-            results = analysis['raw_results']
-            source = get_source_by_name(results, args.class_name, 'class')
-            if source:
-                print_source_code(source, args.class_name, 'class')
-            else:
-                print(f"Class '{args.class_name}' not found.")
+        # Source code retrieval, for any number of names from a single parse
+        queries = ([('function', name) for name in args.function_name or ()] +
+                   [('class', name) for name in args.class_name or ()])
+        if queries:
+            output_sources(args, queries, backend.find_sources(args.file, queries))
             return 0
             
         if args.lines:
             try:
-                analysis = analyze_file(args.file)
-                results = analysis['raw_results']
-                start, end = map(int, args.lines.split('-'))
-                source = get_source_by_lines(results, start, end)
+                ranges = [tuple(map(int, value.split('-'))) for value in args.lines]
+                if any(len(line_range) != 2 for line_range in ranges):
+                    raise ValueError(args.lines)
+            except ValueError:
+                print(f"Invalid line range format. Use 'start-end', e.g., '10-20'.")
+                return 0
+            for (start, end), value, source in zip(ranges, args.lines, backend.sources_by_lines(args.file, ranges)):
                 if source:
                     print_source_code(source, f"lines {start}-{end}")
                 else:
-                    print(f"Invalid line range: {args.lines}")
-            except ValueError:
-                print(f"Invalid line range format. Use 'start-end', e.g., '10-20'.")
+                    print(f"Invalid line range: {value}")
             return 0
             
         # Analyze the file
-        analysis = analyze_file(args.file)
-        results = analysis['raw_results']
-        summary = analysis['summary']
-            
+        analysis = backend.analyze(args.file, include_source=args.include_source or args.json,
+                                   want=wanted_kinds(args), summary=needs_summary(args))
+
+        # JSON Lines output
+        if args.jsonl:
+            write_jsonl(iter_jsonl_records(args.file, analysis, args.jsonl, args.include_source, args.counts))
+            return 0
+
         # JSON output
         if args.json:
-            if args.counts:
-                print(json.dumps({
-                    'file': args.file,
-                    'functions': len(results['functions']),
-                    'decorators': len(results.get('decorators', [])),
-                    'classes': len(results['classes']),
-                    'print_statements': len(results.get('print_calls', []))
-                }, indent=2))
-            else:
-                print(json.dumps(analysis, indent=2))
+            with profiling.phase('serialize'):
+                if args.counts:
+                    print(json.dumps(count_elements(args.file, analysis['raw_results']), indent=2))
+                else:
+                    print(json.dumps(json_ready(analysis), indent=2, default=json_default))
             return 0
-        
-        # Default to showing counts if no specific options
-        if not (args.functions or args.decorators or args.classes or args.prints) and not args.all:
-            args.counts = True
-        
-        # Show counts
-        if args.counts:
-            print(f"File: {args.file}")
-            print(f"  Functions: {len(results['functions'])}")
-            print(f"  Decorators: {len(results.get('decorators', []))}")
-            print(f"  Classes: {len(results['classes'])}")
-            print(f"  Print statements: {len(results.get('print_calls', []))}")
-        
-        # Show detailed information
-        if args.functions or args.all:
-            print_functions(results['functions'], args.verbose)
-        
-        if args.decorators or args.all:
-            print_decorators(results.get('decorators', []))
-        
-        if args.classes or args.all:
-            print_classes(results['classes'], args.verbose)
-        
-        if args.prints or args.all:
-            print_prints(results.get('print_calls', []))
-            
+
+        with profiling.phase('output'):
+            print_analysis(args, args.file, analysis['raw_results'])
+
+    except BrokenPipeError:
+        silence_stdout()
+        return 1
     except Exception as e:
         print(f"Error analyzing file: {e}", file=sys.stderr)
         return 1
         
     return 0
 
+def silence_stdout():
+    """Point stdout at /dev/null after the reader went away (e.g. output piped into head), to stop quietly."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+
+def print_profile(profiler, dump_path=None):
+    """Print a profiler's phase breakdown to stderr, optionally dumping the hot phase's cProfile stats."""
+    print("\nPROFILE:", file=sys.stderr)
+    print(profiler.format_report(), file=sys.stderr)
+    if dump_path:
+        phase = profiler.dump_stats(dump_path)
+        if phase:
+            print(f"cProfile stats of the '{phase}' phase written to {dump_path}", file=sys.stderr)
+        else:
+            print("No cProfile stats were collected in this process; use --workers 1 "
+                  "to profile directory analysis.", file=sys.stderr)
+
+def serve_main(argv):
+    """Entry point of `pycodelens serve`: run or stop the analysis daemon."""
+    from .daemon import DaemonClient, DaemonError, default_socket_path, serve
+    
+    parser = argparse.ArgumentParser(
+        prog='pycodelens serve',
+        description='Run the PyCodeLens analysis daemon on a Unix domain socket'
+    )
+    parser.add_argument('--socket', type=str, default=None,
+                        help=f'Socket path (default: {default_socket_path()})')
+    parser.add_argument('--engine', choices=PYTHON_ENGINES, default='astroid',
+                        help="Default Python parsing engine: 'astroid' (default) or the faster stdlib 'ast'")
+    parser.add_argument('--stop', action='store_true', help='Stop the daemon listening on the socket')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.stop:
+            with DaemonClient(args.socket) as client:
+                client.shutdown()
+            return 0
+        serve(args.socket, args.engine)
+    except KeyboardInterrupt:
+        pass
+    except (DaemonError, RuntimeError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def index_main(argv):
+    """Entry point of `pycodelens index`: create or update the symbol index of a tree."""
+    from .repoindex import DEFAULT_INDEX_PATH, index_tree
+
+    parser = argparse.ArgumentParser(
+        prog='pycodelens index',
+        description='Store the functions, methods, classes, interfaces and decorators of a tree in SQLite'
+    )
+    parser.add_argument('root', nargs='?', default='.', help='Directory to index (default: current directory)')
+    parser.add_argument('--db', default=DEFAULT_INDEX_PATH, help='Index database (default: %(default)s)')
+    parser.add_argument('--engine', choices=PYTHON_ENGINES, default='astroid',
+                        help="Python parsing engine: 'astroid' (default) or the faster stdlib 'ast'")
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes for changed files (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.root):
+        print(f"Error: '{args.root}' does not exist.", file=sys.stderr)
+        return 1
+    try:
+        stats = index_tree(args.root, args.db, args.engine, args.workers)
+    except Exception as e:
+        print(f"Error indexing {args.root}: {e}", file=sys.stderr)
+        return 1
+    for file_path, error in stats['errors']:
+        print(f"Error indexing {file_path}: {error}", file=sys.stderr)
+    print(f"Indexed {stats['scanned']} files in {stats['seconds']:.2f}s: {stats['updated']} updated, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed, {len(stats['errors'])} failed; "
+          f"{stats['symbols']} symbols in {args.db}")
+    return 1 if stats['errors'] else 0
+
+def find_main(argv):
+    """Entry point of `pycodelens find`: look up symbols in the index."""
+    from .repoindex import DEFAULT_INDEX_PATH, SYMBOL_KINDS, RepoIndex
+
+    parser = argparse.ArgumentParser(
+        prog='pycodelens find',
+        description='Find where functions, methods, classes and interfaces are defined, using the index '
+                    'built by `pycodelens index`'
+    )
+    parser.add_argument('name', nargs='?', help="Plain or qualified name, or a glob such as 'test_*'")
+    parser.add_argument('--decorator', '-d', help="Only symbols with this decorator (e.g. 'staticmethod' or 'register')")
+    parser.add_argument('--kind', '-k', choices=SYMBOL_KINDS,
+                        help="Only this kind of symbol ('function' includes methods)")
+    parser.add_argument('--file', help='Only symbols of this file')
+    parser.add_argument('--db', default=DEFAULT_INDEX_PATH, help='Index database (default: %(default)s)')
+    parser.add_argument('--json', '-j', action='store_true', help='Output in JSON format')
+    args = parser.parse_args(argv)
+
+    if args.name is None and args.decorator is None:
+        parser.error('give a name, --decorator or both')
+    if not os.path.exists(args.db):
+        print(f"Error: no index at {args.db}; run `pycodelens index` first.", file=sys.stderr)
+        return 1
+    with RepoIndex(args.db) as index:
+        matches = index.find(args.name, args.kind, args.decorator, args.file)
+
+    try:
+        if args.json:
+            print(json.dumps(matches, indent=2))
+        elif not matches:
+            print("No matching symbols.", file=sys.stderr)
+        else:
+            for match in matches:
+                decorators = ''.join(f" @{d['name']}" for d in match['decorators'])
+                print(f"{os.path.relpath(match['file'])}:{match['line_start']}-{match['line_end']}  "
+                      f"{match['kind']:<9} {match['qualname']}{decorators}")
+    except BrokenPipeError:
+        silence_stdout()
+    return 0 if matches else 1
+
+def diff_main(argv):
+    """Entry point of `pycodelens diff`: report element changes between git revisions."""
+    from .gitscan import GitError, scan_changes
+
+    parser = argparse.ArgumentParser(
+        prog='pycodelens diff',
+        description='Report the functions, classes and interfaces added, removed, moved or modified '
+                    'between two git revisions, analyzing only the files that changed'
+    )
+    parser.add_argument('base', help="Base revision, such as 'main', 'origin/main' or 'HEAD~3'")
+    parser.add_argument('head', nargs='?', help='Head revision (default: the working tree)')
+    parser.add_argument('--path', default='.',
+                        help='Only files below this path (default: current directory)')
+    parser.add_argument('--engine', choices=PYTHON_ENGINES, default='astroid',
+                        help="Python parsing engine: 'astroid' (default) or the faster stdlib 'ast'")
+    parser.add_argument('--cache', action='store_true',
+                        help=f'Cache results on disk in {DEFAULT_CACHE_DIR}/ to skip re-parsing unchanged versions')
+    parser.add_argument('--cache-dir', type=str, help='Cache results on disk in the given directory')
+    parser.add_argument('--json', '-j', action='store_true', help='Output one JSON list of file events')
+    parser.add_argument('--jsonl', action='store_true', help='Stream one JSON Lines record per changed file')
+    args = parser.parse_args(argv)
+
+    if args.cache and not args.cache_dir:
+        args.cache_dir = DEFAULT_CACHE_DIR
+    cache = get_cache(args.cache_dir) if args.cache_dir else None
+
+    events = []
+    failed = False
+    try:
+        for event in scan_changes(args.base, args.head, args.path, args.engine, cache):
+            failed = failed or event['status'] == 'error'
+            if args.json:
+                events.append(event)
+            elif args.jsonl:
+                record_type = 'error' if event['status'] == 'error' else 'delta'
+                write_jsonl([dict({'type': record_type}, **event)])
+            else:
+                for key in ('file', 'old_file'):
+                    if key in event:
+                        event[key] = os.path.relpath(event[key])
+                print_delta(event)
+        if args.json:
+            print(json.dumps(events, indent=2))
+    except GitError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except BrokenPipeError:
+        silence_stdout()
+    return 1 if failed else 0
+
+def callgraph_main(argv):
+    """Entry point of `pycodelens callgraph`: build, query and export the call graph of a tree."""
+    import time
+    from .callgraph import build_call_graph
+
+    parser = argparse.ArgumentParser(
+        prog='pycodelens callgraph',
+        description='Build the cross-file call graph of the Python files below a directory'
+    )
+    parser.add_argument('root', nargs='?', default='.', help='Directory to analyze (default: current directory)')
+    parser.add_argument('--callers', metavar='NAME', help='List the calls to a function or class')
+    parser.add_argument('--callees', metavar='NAME', help='List the calls made by a function or class')
+    parser.add_argument('--export', metavar='FILE', help="Write the whole graph to FILE ('-' for stdout)")
+    parser.add_argument('--format', choices=['json', 'dot'], default='json',
+                        help='Format of --export (default: %(default)s)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--json', '-j', action='store_true', help='Output --callers/--callees in JSON format')
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.root):
+        print(f"Error: '{args.root}' does not exist.", file=sys.stderr)
+        return 1
+    start = time.perf_counter()
+    graph = build_call_graph(args.root, args.workers)
+    for file_path, error in graph.errors:
+        print(f"Error analyzing {file_path}: {error}", file=sys.stderr)
+    stats = graph.stats()
+    print(f"Call graph of {stats['files']} files built in {time.perf_counter() - start:.2f}s: "
+          f"{stats['definitions']} functions and classes, {stats['edges']} calls, "
+          f"{stats['errors']} failed", file=sys.stderr)
+
+    try:
+        if args.export == '-':
+            getattr(graph, f'write_{args.format}')(sys.stdout)
+        elif args.export:
+            with open(args.export, 'w', encoding='utf-8') as f:
+                getattr(graph, f'write_{args.format}')(f)
+        queries = [(label, getattr(graph, label)(name)) for label, name in
+                   (('callers', args.callers), ('callees', args.callees)) if name]
+        if args.json and queries:
+            print(json.dumps(dict(queries), indent=2))
+        elif queries:
+            for label, edges in queries:
+                print(f"\n{label.upper()}:")
+                for edge in edges:
+                    print(f"  {os.path.relpath(edge['file'])}:{edge['line']}  {edge['caller']} -> {edge['callee']}")
+    except BrokenPipeError:
+        silence_stdout()
+    return 1 if graph.errors else 0
+
+def codemod_main(argv):
+    """Entry point of `pycodelens codemod`: apply a manifest of edits across many files."""
+    import time
+    from .codemod import apply_manifest, load_manifest
+
+    parser = argparse.ArgumentParser(
+        prog='pycodelens codemod',
+        description='Apply the function, class and line replacements listed in a JSON manifest '
+                    'to many files in parallel, writing each file atomically'
+    )
+    parser.add_argument('manifest', help='JSON manifest of edits, each with a "file" or "files" (globs allowed)')
+    parser.add_argument('--dry-run', '-n', action='store_true',
+                        help='Write nothing and print the changes as unified diffs')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--engine', choices=PYTHON_ENGINES, default='astroid',
+                        help="Python parsing engine: 'astroid' (default) or the faster stdlib 'ast'")
+    parser.add_argument('--json', '-j', action='store_true', help='Print the report as JSON')
+    parser.add_argument('--report', metavar='FILE', help='Also write the JSON report to FILE')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        plan = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest {args.manifest}: {e}", file=sys.stderr)
+        return 1
+
+    results = []
+    try:
+        for result in apply_manifest(plan, args.workers, args.dry_run, args.engine):
+            results.append(result)
+            if args.json:
+                continue
+            if result['status'] == 'failed':
+                print(f"FAILED {result['file']}: {result['error']}", file=sys.stderr)
+            elif args.dry_run:
+                sys.stdout.write(result.get('diff', ''))
+            elif result['status'] == 'changed':
+                skipped = f", {result['skipped']} optional skipped" if result['skipped'] else ''
+                print(f"Changed {result['file']} ({result['edits']} edit(s){skipped})")
+    except BrokenPipeError:
+        silence_stdout()
+
+    results.sort(key=lambda result: result['file'])
+    counts = {status: sum(1 for result in results if result['status'] == status)
+              for status in ('changed', 'unchanged', 'failed')}
+    report = dict({'dry_run': args.dry_run, 'files': results}, **counts)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    verb = 'would change' if args.dry_run else 'changed'
+    print(f"{len(results)} files in {time.perf_counter() - start:.2f}s: {counts['changed']} {verb}, "
+          f"{counts['unchanged']} unchanged, {counts['failed']} failed", file=sys.stderr)
+    return 1 if counts['failed'] else 0
+
+# Subcommands dispatched on the first argument; anything else is a file or directory
+SUBCOMMANDS = {
+    'serve': serve_main,
+    'index': index_main,
+    'find': find_main,
+    'diff': diff_main,
+    'callgraph': callgraph_main,
+    'codemod': codemod_main,
+}
+
+def main(argv=None):
+    """Main CLI entry point."""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+
+    parser = argparse.ArgumentParser(
+        description='PyCodeLens: Extract and analyze code elements from various programming files',
+        epilog='Run `%(prog)s serve` to start the analysis daemon used by --use-daemon, '
+               '`%(prog)s index` to build a symbol index of a tree, `%(prog)s find` to query it, '
+               '`%(prog)s diff BASE [HEAD]` to report element changes between git revisions, '
+               '`%(prog)s callgraph` to build the call graph of a Python tree '
+               'and `%(prog)s codemod MANIFEST` to apply edits across many files.'
+    )
+    parser.add_argument('file', help="Path to the file, a directory to analyze recursively, "
+                                     "or '-' to read code from stdin (with --lang)")
+    parser.add_argument('--lang', choices=sorted(LANGUAGES), help="Language of the code read from stdin")
+    parser.add_argument('--functions', '-f', action='store_true', help='List functions')
+    parser.add_argument('--decorators', '-d', action='store_true', help='List decorators')
+    parser.add_argument('--classes', '-c', action='store_true', help='List classes')
+    parser.add_argument('--prints', '-p', action='store_true', help='List print statements')
+    parser.add_argument('--counts', '-n', action='store_true', help='Show only counts')
+    parser.add_argument('--all', '-a', action='store_true', help='Show all information')
+    parser.add_argument('--json', '-j', action='store_true', help='Output in JSON format')
+    parser.add_argument('--jsonl', nargs='?', const='file', choices=['file', 'element'],
+                        help='Stream compact JSON Lines, one record per file (default) or per element')
+    parser.add_argument('--include-source', action='store_true',
+                        help='Include source code in --jsonl records')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed information')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='Worker processes for directory analysis (default: CPU count)')
+    parser.add_argument('--max-file-size', type=float, metavar='MB',
+                        help='In directory analysis, skip files larger than this many megabytes')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='In directory analysis, give up on any file that takes longer than this')
+    parser.add_argument('--report', type=str, metavar='FILE',
+                        help='After directory analysis, write a JSON report of the files that were '
+                             'skipped, timed out or failed')
+    
+    # No default: requests forwarded with --use-daemon then use the daemon's own
+    # engine, and in-process parsing falls back to astroid
+    parser.add_argument('--engine', choices=PYTHON_ENGINES, default=None,
+                        help="Python parsing engine: 'astroid' or the faster stdlib 'ast' (default: astroid, "
+                             "or with --use-daemon the engine the daemon was started with)")
+    parser.add_argument('--cache', action='store_true',
+                        help=f'Cache results on disk in {DEFAULT_CACHE_DIR}/ to skip re-parsing unchanged files')
+    parser.add_argument('--cache-dir', type=str, help='Cache results on disk in the given directory')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='Maximum size of the result cache in megabytes (default: %(default)s)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and print added, removed and moved elements of files as they change')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help='Seconds between polls in --watch mode (default: %(default)s)')
+    parser.add_argument('--initial', action='store_true',
+                        help='In --watch mode, first report every element of every file as added')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print a breakdown of time per phase and counters to stderr')
+    parser.add_argument('--profile-dump', metavar='FILE',
+                        help='Also write cProfile stats of the slowest phase to FILE (implies --profile)')
+    parser.add_argument('--use-daemon', action='store_true',
+                        help='Forward single-file requests to a running `pycodelens serve` daemon '
+                             '(falls back to in-process analysis if none is running)')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Socket of the daemon used by --use-daemon')
+    
+    # Code retrieval arguments
+    parser.add_argument('--function-name', type=str, action='append', metavar='NAME',
+                        help="Print source code of functions by name, qualified name (e.g. Class.method) "
+                             "or glob (e.g. 'Class.*'); repeat to look up several, which share one parse")
+    parser.add_argument('--class-name', type=str, action='append', metavar='NAME',
+                        help='Print source code of classes by name, qualified name (e.g. Outer.Inner) or glob; '
+                             'may be repeated')
+    parser.add_argument('--output-dir', type=str, metavar='DIR',
+                        help='Write each source found by --function-name/--class-name to its own file in DIR')
+    parser.add_argument('--lines', type=str, action='append', metavar='START-END',
+                        help='Print lines from the file without parsing it; repeat for several ranges')
+    
+    # Code replacement arguments
+    replacement_group = parser.add_argument_group('Code Replacement Options')
+    replacement_group.add_argument('--replace-function', type=str, help='Name of the function to replace')
+    replacement_group.add_argument('--replace-class', type=str, help='Name of the class to replace')
+    replacement_group.add_argument('--replace-lines', type=str, help='Line range to replace (format: start-end)')
+    replacement_group.add_argument('--replacement-file', type=str, help='File containing the replacement code')
+    replacement_group.add_argument('--replacement-content', type=str, help='Directly specified replacement code')
+    replacement_group.add_argument('--edits', type=str,
+                                   help='JSON file with a list of edits to apply in one atomic write '
+                                        '(objects with element_type, element_name and '
+                                        'replacement_file or replacement_content)')
+    
+    args = parser.parse_args(argv)
+    if os.path.isdir(args.file):
+        # Directory mode only analyzes; these would otherwise be silently ignored
+        single_file = [option for option, value in (
+            ('--function-name', args.function_name), ('--class-name', args.class_name),
+            ('--output-dir', args.output_dir), ('--lines', args.lines),
+            ('--replace-function', args.replace_function), ('--replace-class', args.replace_class),
+            ('--replace-lines', args.replace_lines), ('--edits', args.edits),
+            ('--use-daemon', args.use_daemon)) if value]
+        if single_file:
+            parser.error(f"{', '.join(single_file)}: cannot be used when analyzing a directory")
+    if args.cache and not args.cache_dir:
+        args.cache_dir = DEFAULT_CACHE_DIR
+    args.cache_max_bytes = args.cache_size * 1024 * 1024
+    cache = get_cache(args.cache_dir, args.cache_max_bytes) if args.cache_dir else None
+    
+    profiler = None
+    if args.profile or args.profile_dump:
+        profiler = profiling.Profiler(collect_stats=bool(args.profile_dump))
+    if profiler is None:
+        return run(args, cache)
+
+    with profiler:
+        status = run(args, cache)
+    print_profile(profiler, args.profile_dump)
+    return status
+
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,138 @@
+"""
+Repository-wide bulk replacement for PyCodeLens.
+
+`pycodelens codemod MANIFEST` applies replace_elements() edits to many files
+at once: a JSON manifest names the target files (or glob patterns) and the
+edits, files are processed by a pool of worker processes, each file is
+parsed once and written atomically, and a failing file is reported without
+stopping the rest of the batch. With a dry run nothing is written and each
+file's change is returned as a unified diff.
+
+A manifest is a list of edits (or an object with an 'edits' list); each
+edit has the keys of replace_elements() plus 'file' or 'files':
+
+    [
+      {"files": ["src/**/*.py"], "element_type": "function", "element_name": "retry",
+       "replacement_file": "retry.py", "optional": true},
+      {"file": "src/app.py", "element_type": "lines", "element_name": "1-3",
+       "replacement_content": "# New header"}
+    ]
+
+Paths are relative to the manifest's directory. An 'optional' edit is
+skipped in files that do not define its element.
+"""
+
+import os
+import glob
+import json
+import difflib
+
+from .analyzer import EditError, atomic_write, is_glob_pattern, render_edits
+from .scanner import pool_map
+
+
+def load_manifest(manifest_path):
+    """
+    Read a manifest and group its edits by target file.
+
+    Replacement files are read once here rather than once per target.
+
+    Returns:
+        List of (file_path, edits) tuples sorted by path; each file's edits
+        keep the manifest's order
+
+    Raises:
+        ValueError: If the manifest is malformed
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    entries = manifest.get('edits') if isinstance(manifest, dict) else manifest
+    if not isinstance(entries, list):
+        raise ValueError("The manifest must be a list of edits or an object with an 'edits' list")
+
+    replacements = {}
+    edits_by_file = {}
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Manifest entry {number} is not an object")
+        targets = entry.get('files', entry.get('file'))
+        if isinstance(targets, str):
+            targets = [targets]
+        if not targets:
+            raise ValueError(f"Manifest entry {number} names no 'file' or 'files'")
+
+        edit = {key: value for key, value in entry.items() if key not in ('file', 'files')}
+        if edit.get('replacement_file'):
+            replacement_path = os.path.join(base, edit.pop('replacement_file'))
+            if replacement_path not in replacements:
+                with open(replacement_path, 'r', encoding='utf-8') as f:
+                    replacements[replacement_path] = f.read()
+            edit['replacement_content'] = replacements[replacement_path]
+
+        for target in targets:
+            pattern = os.path.join(base, target)
+            paths = sorted(glob.glob(pattern, recursive=True)) if is_glob_pattern(target) else [pattern]
+            for path in paths:
+                edits_by_file.setdefault(os.path.normpath(path), []).append(edit)
+    return sorted(edits_by_file.items())
+
+
+def unified_diff(file_path, original, new_content):
+    """Unified diff between two versions of a file, labelled a/ and b/ like git's."""
+    name = os.path.relpath(file_path)
+    lines = []
+    for line in difflib.unified_diff(original.splitlines(True), new_content.splitlines(True),
+                                     f'a/{name}', f'b/{name}'):
+        if not line.endswith('\n'):
+            line += '\n\\ No newline at end of file\n'
+        lines.append(line)
+    return ''.join(lines)
+
+
+def _apply_one(task):
+    """Apply the edits of one file, capturing failures instead of raising."""
+    file_path, edits, options = task
+    try:
+        original, new_content, applied = render_edits(file_path, edits, options['engine'])
+        result = {'file': file_path, 'status': 'changed', 'edits': applied, 'skipped': len(edits) - applied}
+        if new_content == original:
+            result['status'] = 'unchanged'
+        elif options['dry_run']:
+            result['diff'] = unified_diff(file_path, original, new_content)
+        else:
+            atomic_write(file_path, new_content)
+    except EditError as e:
+        return {'file': file_path, 'status': 'failed', 'error': str(e)}
+    except Exception as e:
+        return {'file': file_path, 'status': 'failed', 'error': f"Error applying edits: {e}"}
+    return result
+
+
+def apply_manifest(plan, workers=None, dry_run=False, engine=None):
+    """
+    Apply a manifest's edits to every target file.
+
+    Files are dispatched to a process pool and results are yielded as soon
+    as each one is finished, so the order is not deterministic when more
+    than one worker is used.
+
+    Args:
+        plan: Path of a manifest, or the (file_path, edits) list returned
+            by load_manifest()
+        workers: Number of worker processes (defaults to the CPU count;
+            0 or 1 applies the edits in the current process)
+        dry_run: Write nothing and return each change as a unified diff
+        engine: Python parsing engine ('astroid' or 'ast')
+
+    Yields:
+        Dictionaries with 'file', 'status' ('changed', 'unchanged' or
+        'failed'), 'edits' (the number applied) and 'skipped' (optional
+        edits whose element was not found), or 'error' for failed files;
+        dry runs add the 'diff' of changed files
+    """
+    if isinstance(plan, str):
+        plan = load_manifest(plan)
+    options = {'dry_run': dry_run, 'engine': engine}
+    tasks = [(file_path, edits, options) for file_path, edits in plan]
+    yield from pool_map(_apply_one, tasks, workers)
@@ -0,0 +1,350 @@
+"""
+Long-running analysis daemon for PyCodeLens.
+
+The daemon keeps the parser backends imported and recently extracted
+results in memory, and serves requests over a local Unix domain socket, so
+editor integrations and hooks do not pay interpreter start-up and parsing
+costs on every call.
+
+The protocol is newline-delimited JSON. Each request is an object with an
+'op' field ('analyze', 'analyze_source', 'get_source_by_name',
+'get_sources_by_names', 'get_source_by_lines', 'replace_element',
+'replace_elements', 'ping' or 'shutdown') and the
+operation's parameters; each response is an object with 'ok' and either
+'result' or 'error'. File paths must be absolute.
+"""
+
+import os
+import json
+import socket
+import getpass
+import tempfile
+import threading
+import socketserver
+from collections import OrderedDict
+
+from . import __version__
+from .analyzer import (build_summary, extract_code_elements, extract_code_elements_from_string,
+                       find_elements, find_elements_matching, json_default,
+                       normalize_want, read_line_ranges, replace_element, replace_elements,
+                       without_source)
+
+# Number of files whose results are kept in memory
+DEFAULT_MAX_ENTRIES = 512
+
+
+def default_socket_path():
+    """Socket path used when none is given ($PYCODELENS_SOCKET overrides it)."""
+    if os.environ.get('PYCODELENS_SOCKET'):
+        return os.environ['PYCODELENS_SOCKET']
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'pycodelens.sock')
+    return os.path.join(tempfile.gettempdir(), f'pycodelens-{getpass.getuser()}.sock')
+
+
+class DaemonError(Exception):
+    """An operation failed inside the daemon."""
+
+
+class DaemonUnavailable(DaemonError):
+    """No daemon is listening on the socket."""
+
+
+class AnalysisService:
+    """
+    Request handling of the daemon, independent of the transport.
+
+    Results are cached per file and engine and reused while the file's
+    modification time and size are unchanged.
+    """
+
+    def __init__(self, engine=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.engine = engine
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def results_for(self, file_path, engine=None):
+        """Return extracted results for a file, parsing it only if it changed."""
+        st = os.stat(file_path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        key = (file_path, engine or self.engine)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._results.move_to_end(key)
+                return entry[1]
+
+        results = extract_code_elements(file_path, engine=key[1], records=True)
+        with self._lock:
+            self._results[key] = (stamp, results)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return results
+
+    def invalidate(self, file_path):
+        """Drop the cached results of a file."""
+        with self._lock:
+            for key in [key for key in self._results if key[0] == file_path]:
+                del self._results[key]
+
+    def handle(self, request):
+        """
+        Run one request.
+
+        Args:
+            request: Dictionary with an 'op' field and the op's parameters
+
+        Returns:
+            Response dictionary with 'ok' and 'result' or 'error'
+        """
+        op = request.get('op')
+        handler = getattr(self, f'op_{op}', None) if isinstance(op, str) else None
+        if handler is None:
+            return {'ok': False, 'error': f"Unknown operation: {op}"}
+        params = {key: value for key, value in request.items() if key != 'op'}
+        try:
+            return {'ok': True, 'result': handler(**params)}
+        except Exception as e:
+            return {'ok': False, 'error': str(e)}
+
+    def op_ping(self):
+        return {'version': __version__, 'pid': os.getpid()}
+
+    def op_analyze(self, file, engine=None, include_source=False, want=None, summary=True):
+        # Complete results are kept for later requests; want only trims the response
+        return self._analysis(file, self.results_for(file, engine), include_source, want, summary)
+
+    def op_analyze_source(self, code, language=None, filename=None, engine=None,
+                          include_source=False, want=None, summary=True):
+        # Buffers (such as unsaved editor contents) are not cached
+        results = extract_code_elements_from_string(code, language, filename, engine or self.engine, want,
+                                                    records=True)
+        return self._analysis(filename or '<string>', results, include_source, want, summary)
+
+    def _analysis(self, file, results, include_source, want, summary):
+        want = normalize_want(want)
+        raw_results = {k: v for k, v in results.items() if not k.startswith('_') and k in want}
+        if include_source:
+            # Materialize the lazy source slices for serialization
+            raw_results = json.loads(json.dumps(raw_results, default=json_default))
+        else:
+            raw_results = without_source(raw_results)
+        return {'raw_results': raw_results, 'summary': build_summary(file, raw_results) if summary else None}
+
+    def op_get_source_by_name(self, file, name, element_type='function', engine=None):
+        matches = find_elements(self.results_for(file, engine), name, element_type)
+        return {
+            'source': matches[0]['source_code'] if matches else None,
+            'matches': [without_source(match) for match in matches],
+        }
+
+    def op_get_sources_by_names(self, file, queries, engine=None):
+        # queries: [element_type, name or glob pattern] pairs; matches carry their source
+        results = self.results_for(file, engine)
+        found = [find_elements_matching(results, [pattern], element_type)[pattern]
+                 for element_type, pattern in queries]
+        return {'matches': json.loads(json.dumps(found, default=json_default))}
+
+    def op_get_source_by_lines(self, file, ranges):
+        # ranges: [start_line, end_line] pairs; lines are read straight from the file, without parsing it
+        return {'sources': read_line_ranges(file, [tuple(line_range) for line_range in ranges])}
+
+    def op_replace_element(self, file, element_type, element_name,
+                           replacement_file=None, replacement_content=None):
+        try:
+            success, message = replace_element(file, element_type, element_name,
+                                               replacement_file, replacement_content)
+        finally:
+            self.invalidate(file)
+        return {'success': success, 'message': message}
+
+    def op_replace_elements(self, file, edits):
+        try:
+            success, message = replace_elements(file, edits)
+        finally:
+            self.invalidate(file)
+        return {'success': success, 'message': message}
+
+    def op_shutdown(self):
+        return {}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves newline-delimited JSON requests on one connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request = {}
+                response = {'ok': False, 'error': f"Invalid request: {e}"}
+            else:
+                response = self.server.service.handle(request)
+            self.wfile.write(json.dumps(response, default=json_default).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+            if request.get('op') == 'shutdown':
+                # shutdown() blocks until serve_forever() returns, so it cannot
+                # run on the serving thread itself
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class AnalysisServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """Threaded Unix socket server around an AnalysisService."""
+
+        daemon_threads = True
+
+        def __init__(self, socket_path, service):
+            self.service = service
+            super().__init__(socket_path, _RequestHandler)
+else:
+    AnalysisServer = None
+
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket file left behind by a daemon that is no longer running."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.remove(socket_path)
+    else:
+        raise RuntimeError(f"A daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path=None, engine=None, max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Run the analysis daemon until a 'shutdown' request arrives.
+
+    Args:
+        socket_path: Path of the Unix domain socket (default_socket_path()
+            if None)
+        engine: Default Python parsing engine for requests that name none
+        max_entries: Number of files whose results are kept in memory
+    """
+    if AnalysisServer is None:
+        raise RuntimeError("The daemon requires Unix domain socket support")
+    socket_path = socket_path or default_socket_path()
+    _remove_stale_socket(socket_path)
+
+    # Only the current user may talk to the daemon
+    old_umask = os.umask(0o177)
+    try:
+        server = AnalysisServer(socket_path, AnalysisService(engine, max_entries))
+    finally:
+        os.umask(old_umask)
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+
+
+class DaemonClient:
+    """
+    Client side of the daemon protocol.
+
+    Exposes the same methods as the CLI's in-process backend, so commands
+    can be forwarded to a running daemon transparently.
+    """
+
+    def __init__(self, socket_path=None, engine=None, timeout=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.engine = engine
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def connect(self):
+        """Open the connection; raises DaemonUnavailable if no daemon is listening."""
+        if self._sock is not None:
+            return self
+        if not hasattr(socket, 'AF_UNIX'):
+            raise DaemonUnavailable("Unix domain sockets are not supported on this platform")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise DaemonUnavailable(f"No daemon listening on {self.socket_path}: {e}")
+        self._sock = sock
+        self._file = sock.makefile('rwb')
+        return self
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = self._file = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, op, **params):
+        """Send one request and return its result; raises DaemonError on failure."""
+        self.connect()
+        payload = dict(params, op=op)
+        self._file.write(json.dumps(payload).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("The daemon closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise DaemonError(response.get('error', 'Unknown error'))
+        return response['result']
+
+    def analyze(self, file_path, include_source=True, want=None, summary=True):
+        analysis = self.request('analyze', file=os.path.abspath(file_path), engine=self.engine,
+                                include_source=include_source,
+                                want=None if want is None else sorted(want), summary=summary)
+        if analysis['summary'] is not None:
+            # Report the path as the caller gave it, like analyze_file()
+            analysis['summary']['file'] = file_path
+        return analysis
+
+    def find_sources(self, file_path, queries):
+        result = self.request('get_sources_by_names', file=os.path.abspath(file_path),
+                              queries=[list(query) for query in queries], engine=self.engine)
+        return result['matches']
+
+    def sources_by_lines(self, file_path, ranges):
+        result = self.request('get_source_by_lines', file=os.path.abspath(file_path), ranges=list(ranges))
+        return result['sources']
+
+    def replace_element(self, file_path, element_type, element_name,
+                        replacement_file=None, replacement_content=None):
+        result = self.request('replace_element', file=os.path.abspath(file_path),
+                              element_type=element_type, element_name=element_name,
+                              replacement_file=replacement_file and os.path.abspath(replacement_file),
+                              replacement_content=replacement_content)
+        return result['success'], result['message']
+
+    def replace_elements(self, file_path, edits):
+        edits = [dict(edit, replacement_file=os.path.abspath(edit['replacement_file']))
+                 if edit.get('replacement_file') else edit for edit in edits]
+        result = self.request('replace_elements', file=os.path.abspath(file_path), edits=edits)
+        return result['success'], result['message']
+
+    def shutdown(self):
+        return self.request('shutdown')
@@ -0,0 +1,194 @@
+"""
+Git-aware incremental analysis for PyCodeLens.
+
+`pycodelens diff BASE [HEAD]` asks the local git binary which files changed
+between two revisions (or between a revision and the working tree), parses
+both versions of only those files and reports the functions, classes and
+interfaces that were added, removed, moved or modified. Old versions are
+read straight from git's object store, so nothing is checked out, and the
+rest of the repository is never scanned.
+"""
+
+import os
+import subprocess
+
+from .analyzer import decode_source, extract_code_elements, is_supported_file
+from .watch import DELTA_KINDS, diff_elements, is_empty_delta
+
+# git diff status letters (the first letter of the status field)
+_STATUSES = {
+    'A': 'added',
+    'D': 'deleted',
+    'M': 'modified',
+    'T': 'modified',
+    'R': 'renamed',
+}
+
+
+class GitError(RuntimeError):
+    """Raised when git is missing or a git command fails."""
+
+
+def _git(args, cwd, input=None):
+    """Run a git command and return its standard output as bytes."""
+    try:
+        completed = subprocess.run(['git'] + args, cwd=cwd, input=input,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise GitError("git is not installed or not on PATH")
+    if completed.returncode != 0:
+        message = completed.stderr.decode('utf-8', 'replace').strip()
+        raise GitError(message or f"git {args[0]} failed with status {completed.returncode}")
+    return completed.stdout
+
+
+def repo_root(path='.'):
+    """Return the top-level directory of the git repository containing path."""
+    directory = path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path))
+    return os.fsdecode(_git(['rev-parse', '--show-toplevel'], directory).rstrip(b'\n'))
+
+
+def _blob_id(object_id):
+    # git writes an all-zero ID for a side that does not exist or that lives
+    # only in the working tree
+    return None if not object_id.strip('0') else object_id
+
+
+def changed_files(base, head=None, path='.'):
+    """
+    List the supported source files that differ between two revisions.
+
+    Args:
+        base: Base revision (a branch, tag, commit or expression such as HEAD~3)
+        head: Head revision; None compares base with the working tree
+            (staged and unstaged changes; untracked files are not included)
+        path: Only files below this file or directory are listed
+
+    Returns:
+        Tuple (root, changes): the repository's top-level directory and a
+        list of dictionaries with 'status' ('added', 'deleted', 'modified' or
+        'renamed'), 'path' and 'old_path' (relative to root, None for the side
+        that does not exist) and 'old_blob' and 'new_blob' (object IDs, None
+        for a missing side or a side read from the working tree)
+    """
+    root = repo_root(path)
+    pathspec = os.path.relpath(os.path.realpath(path), root)
+    args = ['diff', '--raw', '-z', '--no-abbrev', '--find-renames', base]
+    if head is not None:
+        args.append(head)
+    output = _git(args + ['--', pathspec], root)
+
+    changes = []
+    fields = output.split(b'\0')
+    i = 0
+    while i < len(fields) and fields[i].startswith(b':'):
+        # ":<old mode> <new mode> <old id> <new id> <status>" then one path,
+        # or two (old and new) for renames and copies
+        _, _, old_id, new_id, status = fields[i][1:].decode('ascii').split(' ')
+        paths = [os.fsdecode(p) for p in fields[i + 1:i + (3 if status[0] in 'RC' else 2)]]
+        i += 1 + len(paths)
+        old_path, new_path = paths[0], paths[-1]
+        status = _STATUSES.get(status[0], 'modified')
+        old_blob, new_blob = _blob_id(old_id), _blob_id(new_id)
+        if status == 'added':
+            old_path = None
+        elif status == 'deleted':
+            new_path = None
+
+        # A file renamed to or from an unsupported extension counts as added or deleted
+        if old_path is not None and not is_supported_file(old_path):
+            old_path = old_blob = None
+        if new_path is not None and not is_supported_file(new_path):
+            new_path = new_blob = None
+        if old_path is None and new_path is None:
+            continue
+        if old_path is None:
+            status = 'added'
+        elif new_path is None:
+            status = 'deleted'
+        changes.append({'status': status, 'path': new_path or old_path, 'old_path': old_path,
+                        'old_blob': old_blob, 'new_blob': new_blob})
+    return root, changes
+
+
+def read_blobs(root, object_ids):
+    """
+    Read blobs from the object store with a single `git cat-file --batch`.
+
+    Returns:
+        Dictionary mapping each object ID to its content as bytes
+    """
+    object_ids = list(dict.fromkeys(object_ids))
+    if not object_ids:
+        return {}
+    output = _git(['cat-file', '--batch'], root, input=''.join(oid + '\n' for oid in object_ids).encode('ascii'))
+    blobs = {}
+    position = 0
+    for object_id in object_ids:
+        end = output.index(b'\n', position)
+        header = output[position:end].split(b' ')
+        if header[-1] == b'missing':
+            raise GitError(f"object {object_id} is missing")
+        size = int(header[2])
+        blobs[object_id] = output[end + 1:end + 1 + size]
+        # The content is followed by a newline
+        position = end + 1 + size + 1
+    return blobs
+
+
+def _elements(file_path, code, cache, engine):
+    """Extract the diffed kinds of one version of a file, from code or else from disk."""
+    results = extract_code_elements(file_path, cache, engine, want=DELTA_KINDS, code=code, records=True)
+    return {k: v for k, v in results.items() if not k.startswith('_')}
+
+
+def scan_changes(base, head=None, path='.', engine=None, cache=None):
+    """
+    Analyze only the files changed between two revisions and yield per-file deltas.
+
+    Both versions of each changed file are parsed, and elements whose source
+    changed are reported as modified in addition to the added, removed and
+    moved elements that watch mode reports. Blob contents go through the
+    result cache like files do, as its keys are content hashes.
+
+    Args:
+        base: Base revision
+        head: Head revision; None compares base with the working tree
+        path: Only files below this file or directory are analyzed
+        engine: Python parsing engine ('astroid' or 'ast')
+        cache: Optional ResultCache for extraction results
+
+    Yields:
+        Dictionaries with 'file' (absolute path), 'status' ('added',
+        'deleted', 'modified', 'renamed' or 'error'), 'old_file' for renames,
+        and the 'added', 'removed', 'moved' and 'modified' lists (or 'error').
+        Modified files whose elements did not change produce no event.
+
+    Raises:
+        GitError: If git fails, such as for an unknown revision
+    """
+    root, changes = changed_files(base, head, path)
+    blobs = read_blobs(root, [oid for change in changes
+                              for oid in (change['old_blob'], change['new_blob']) if oid])
+
+    for change in changes:
+        file_path = os.path.join(root, change['path'])
+        event = {'file': file_path, 'status': change['status']}
+        if change['status'] == 'renamed':
+            event['old_file'] = os.path.join(root, change['old_path'])
+        try:
+            old = new = None
+            if change['old_path'] is not None:
+                old = _elements(os.path.join(root, change['old_path']),
+                                decode_source(blobs[change['old_blob']]), cache, engine)
+            if change['status'] != 'deleted':
+                code = decode_source(blobs[change['new_blob']]) if change['new_blob'] else None
+                new = _elements(file_path, code, cache, engine)
+        except Exception as e:
+            yield {'file': file_path, 'status': 'error', 'error': str(e)}
+            continue
+        delta = diff_elements(old, new, compare_source=True)
+        if change['status'] == 'modified' and is_empty_delta(delta):
+            continue
+        event.update(delta)
+        yield event
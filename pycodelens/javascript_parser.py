@@ -0,0 +1,338 @@
+"""
+JavaScript and TypeScript parsers for PyCodeLens.
+
+Imported only when a JavaScript or TypeScript file is analyzed.
+"""
+
+import os
+import re
+
+from . import profiling
+from .analyzer import BaseCodeParser, ClassElement, CodeElement, MappedSourceBuffer, normalize_want
+
+
+# Tokens that matter when pairing braces in JavaScript/TypeScript code:
+# comments and string literals are consumed whole so that braces inside them
+# are ignored; template literals and slashes need extra context to handle.
+_JS_CODE_TOKEN = re.compile(r"""
+    //[^\n]*
+  | /\*.*?(?:\*/|\Z)
+  | "(?:[^"\\\n]+|\\.)*"?
+  | '(?:[^'\\\n]+|\\.)*'?
+  | [{}`/]
+""", re.S | re.X)
+
+# Text of a template literal up to its closing backtick or next ${
+_JS_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]+|\\.|\$(?!\{))*(`|\$\{)?", re.S)
+
+# Remainder of a regular expression literal after its opening slash
+_JS_REGEX_BODY = re.compile(r"(?:[^/\\\n\[]+|\\.|\[(?:[^\]\\\n]+|\\.)*\]?)*/?")
+
+# Keywords after which a slash starts a regular expression, not a division
+_JS_REGEX_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+])
+
+
+def _slash_starts_regex(code, offset):
+    """Guess whether the slash at offset opens a regex literal."""
+    i = offset - 1
+    while i >= 0 and code[i] in ' \t\r\n':
+        i -= 1
+    if i < 0:
+        return True
+
+    char = code[i]
+    if char.isalnum() or char in '_$':
+        word_end = i + 1
+        while i >= 0 and (code[i].isalnum() or code[i] in '_$'):
+            i -= 1
+        return code[i + 1:word_end] in _JS_REGEX_KEYWORDS
+    # After a closing bracket or a string the slash is a division
+    return char not in ')]"\'`'
+
+
+# Byte values of identifier characters; bytes of UTF-8 multibyte sequences
+# count as identifier characters, as non-ASCII letters do in the str scanner
+_JS_WORD_BYTES = frozenset(
+    b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$' + bytes(range(0x80, 0x100))
+)
+_JS_REGEX_KEYWORDS_BYTES = frozenset(keyword.encode('ascii') for keyword in _JS_REGEX_KEYWORDS)
+
+
+def _slash_starts_regex_bytes(code, offset):
+    """_slash_starts_regex() for UTF-8 bytes (indexing bytes yields integers)."""
+    i = offset - 1
+    while i >= 0 and code[i] in b' \t\r\n':
+        i -= 1
+    if i < 0:
+        return True
+
+    if code[i] in _JS_WORD_BYTES:
+        word_end = i + 1
+        while i >= 0 and code[i] in _JS_WORD_BYTES:
+            i -= 1
+        return code[i + 1:word_end] in _JS_REGEX_KEYWORDS_BYTES
+    return code[i] not in b')]"\'`'
+
+
+def _bytes_regex(pattern, flags=0):
+    """
+    Compile a str regex for matching UTF-8 bytes.
+    
+    \\w is widened to the bytes of multibyte sequences so that non-ASCII
+    identifiers match as they do in str patterns.
+    """
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags & ~re.UNICODE
+    return re.compile(pattern.replace(r'\w', r'[\w\x80-\xff]').encode('ascii'), flags)
+
+
+class _JSSyntax:
+    """The token regexes and literals used by match_braces() for one data type."""
+    
+    def __init__(self, code_token, template_chunk, regex_body, slash_starts_regex, literal):
+        self.code_token = code_token
+        self.template_chunk = template_chunk
+        self.regex_body = regex_body
+        self.slash_starts_regex = slash_starts_regex
+        self.open, self.close, self.backtick, self.slash, self.substitution = (
+            literal(token) for token in ('{', '}', '`', '/', '${'))
+
+
+_JS_STR_SYNTAX = _JSSyntax(_JS_CODE_TOKEN, _JS_TEMPLATE_CHUNK, _JS_REGEX_BODY,
+                           _slash_starts_regex, str)
+_JS_BYTES_SYNTAX = _JSSyntax(_bytes_regex(_JS_CODE_TOKEN), _bytes_regex(_JS_TEMPLATE_CHUNK),
+                             _bytes_regex(_JS_REGEX_BODY), _slash_starts_regex_bytes,
+                             lambda token: token.encode('ascii'))
+
+
+def match_braces(code):
+    """
+    Pair up the curly braces of JavaScript/TypeScript code in a single pass.
+    
+    Braces inside comments, string literals, template literal text and
+    regular expression literals are ignored; braces inside template literal
+    ${...} substitutions are paired like any other code.
+    
+    Args:
+        code: JavaScript or TypeScript source code, as a string or as UTF-8
+            bytes (including a memory map)
+        
+    Returns:
+        Dictionary mapping the offset of each opening brace to the offset
+        of its closing brace (unclosed braces are omitted)
+    """
+    syntax = _JS_STR_SYNTAX if isinstance(code, str) else _JS_BYTES_SYNTAX
+    code_token = syntax.code_token
+    pairs = {}
+    # Offsets of open braces; -1 marks a template literal ${ substitution
+    stack = []
+    pos = 0
+    in_template = False
+    code_length = len(code)
+    
+    while pos < code_length:
+        if in_template:
+            match = syntax.template_chunk.match(code, pos)
+            pos = match.end()
+            if match.group(1) == syntax.substitution:
+                stack.append(-1)
+            in_template = False
+            continue
+        
+        match = code_token.search(code, pos)
+        if match is None:
+            break
+        token = match.group()
+        pos = match.end()
+        
+        if token == syntax.open:
+            stack.append(match.start())
+        elif token == syntax.close:
+            if stack:
+                open_offset = stack.pop()
+                if open_offset < 0:
+                    in_template = True
+                else:
+                    pairs[open_offset] = match.start()
+        elif token == syntax.backtick:
+            in_template = True
+        elif token == syntax.slash and syntax.slash_starts_regex(code, match.start()):
+            pos = syntax.regex_body.match(code, pos).end()
+    
+    return pairs
+
+
+# JavaScript/TypeScript files at least this large are memory-mapped and
+# scanned as bytes instead of being read into a string
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class JavaScriptParser(BaseCodeParser):
+    """
+    Basic parser for JavaScript code.
+    
+    Files of MMAP_THRESHOLD bytes or more are memory-mapped and scanned as
+    bytes (use_mmap=True or False forces either way).
+    """
+    
+    def __init__(self, file_path, use_mmap=None, code=None):
+        self.use_mmap = use_mmap
+        self._brace_pairs = None
+        super().__init__(file_path, code)
+    
+    def load_source(self, file_path):
+        use_mmap = self.use_mmap
+        if use_mmap is None:
+            use_mmap = os.path.getsize(file_path) >= MMAP_THRESHOLD
+        if use_mmap:
+            try:
+                source = MappedSourceBuffer(file_path)
+            except ValueError:
+                # Empty files cannot be mapped
+                source = None
+            # Text mode turns a lone carriage return into a line break; leave
+            # such files to the text reader so line numbers stay the same
+            if source is not None and source.data.find(b'\r') == -1:
+                profiling.count('bytes_mapped', len(source.data))
+                return source
+        return super().load_source(file_path)
+    
+    @property
+    def brace_pairs(self):
+        """Mapping of opening to closing brace offsets (built on first use)."""
+        if self._brace_pairs is None:
+            with profiling.phase('parse'):
+                self._brace_pairs = match_braces(self.source.data)
+        return self._brace_pairs
+    
+    def find_blocks(self, pattern):
+        """
+        Find brace-delimited blocks whose header matches a regex.
+        
+        Args:
+            pattern: Regex ending in the block's opening brace, with the
+                element name as its first group
+                
+        Yields:
+            Tuples of (name, line_start, line_end, span), where span is the
+            (start, end) character offsets of the block
+        """
+        data = self.source.data
+        is_bytes = not isinstance(data, str)
+        if is_bytes:
+            pattern = _bytes_regex(pattern)
+        for match in re.finditer(pattern, data):
+            name = match.group(1).decode('utf-8', 'replace') if is_bytes else match.group(1)
+            line_start = self.line_number(match.start())
+            close_offset = self.brace_pairs.get(match.end() - 1)
+            if close_offset is None:
+                # The brace is unclosed or sits inside a comment or string
+                line_end = line_start
+                close_offset = match.end()
+            else:
+                line_end = self.line_number(close_offset)
+            yield name, line_start, line_end, (match.start(), close_offset)
+    
+    @staticmethod
+    def assign_qualnames(blocks):
+        """
+        Set each element's 'qualname' from the blocks that enclose it.
+        
+        Args:
+            blocks: List of (span, element) tuples as found by find_blocks()
+        """
+        enclosing = []  # (end offset, qualname) of the blocks containing the current one
+        for (start, end), element in sorted(blocks, key=lambda block: (block[0][0], -block[0][1])):
+            while enclosing and enclosing[-1][0] < start:
+                enclosing.pop()
+            if enclosing:
+                element['qualname'] = enclosing[-1][1] + '.' + element['name']
+            enclosing.append((end, element['qualname']))
+    
+    def extract_elements(self, want=None):
+        """
+        Extract code elements from JavaScript file.
+        
+        Qualified names depend on every enclosing block, so all blocks are
+        scanned whenever any element kind is wanted; want trims the results.
+        """
+        # This is a simplified implementation
+        # A real implementation would use a proper JavaScript parser
+        want = normalize_want(want)
+        functions = []
+        classes = []
+        blocks = []
+        
+        # Basic regex-based parsing for demonstration
+        if not want.isdisjoint(('functions', 'classes')):
+            # Find function declarations
+            func_pattern = r'function\s+(\w+)\s*\([^)]*\)\s*\{'
+            for func_name, line_start, line_end, span in self.find_blocks(func_pattern):
+                func_info = CodeElement(self.source, func_name, func_name, line_start, line_end)
+                functions.append(func_info)
+                blocks.append((span, func_info))
+            
+            # Find class declarations (ES6)
+            class_pattern = r'class\s+(\w+)(?:\s+extends\s+\w+)?\s*\{'
+            for class_name, line_start, line_end, span in self.find_blocks(class_pattern):
+                class_info = ClassElement(self.source, class_name, class_name, line_start, line_end)  # Methods are not parsed
+                classes.append(class_info)
+                blocks.append((span, class_info))
+            
+            self.assign_qualnames(blocks)
+        
+        results = {
+            'functions': functions,
+            'classes': classes,
+            'decorators': [],  # JavaScript doesn't have Python-style decorators
+            'print_calls': [],  # Not tracking console.log statements
+        }
+        return {key: value for key, value in results.items() if key in want}
+
+
+class TypeScriptParser(JavaScriptParser):
+    """Parser for TypeScript code."""
+    
+    def extract_elements(self, want=None):
+        """Extract code elements from TypeScript file (see JavaScriptParser.extract_elements)."""
+        want = normalize_want(want)
+        functions = []
+        classes = []
+        interfaces = []
+        blocks = []
+        
+        if not want.isdisjoint(('functions', 'classes', 'interfaces')):
+            # Parse functions
+            func_pattern = r'function\s+(\w+)\s*\([^)]*\)\s*(?::\s*\w+(?:\[\]|\<.*\>)?)?\s*\{'
+            for func_name, line_start, line_end, span in self.find_blocks(func_pattern):
+                func_info = CodeElement(self.source, func_name, func_name, line_start, line_end)
+                functions.append(func_info)
+                blocks.append((span, func_info))
+            
+            # Parse classes
+            class_pattern = r'class\s+(\w+)(?:\s+(?:extends|implements)\s+\w+)?\s*\{'
+            for class_name, line_start, line_end, span in self.find_blocks(class_pattern):
+                class_info = ClassElement(self.source, class_name, class_name, line_start, line_end)  # Methods are not parsed
+                classes.append(class_info)
+                blocks.append((span, class_info))
+            
+            # Parse interfaces
+            interface_pattern = r'interface\s+(\w+)(?:\s+extends\s+\w+)?\s*\{'
+            for interface_name, line_start, line_end, span in self.find_blocks(interface_pattern):
+                interface_info = CodeElement(self.source, interface_name, interface_name, line_start, line_end)
+                interfaces.append(interface_info)
+                blocks.append((span, interface_info))
+            
+            self.assign_qualnames(blocks)
+        
+        results = {
+            'functions': functions,
+            'classes': classes,
+            'interfaces': interfaces,
+            'decorators': [],
+            'print_calls': [],
+        }
+        return {key: value for key, value in results.items() if key in want}
@@ -0,0 +1,166 @@
+"""
+Per-phase timing and counters for PyCodeLens.
+
+The analyzer marks its phases ('read', 'cache', 'parse', 'walk', 'summary',
+'serialize', 'output') and counts what it processes ('files', 'bytes_read',
+'nodes_visited', 'elements'). Nothing is recorded unless a Profiler is
+active, and an inactive phase costs a single function call:
+
+    with Profiler(callback=print) as profiler:
+        analyze_file('module.py')
+    print(profiler.format_report())
+
+Phases may nest; each phase is charged only its own (self) time, so the
+phase timings add up to the total. The active profiler is process-wide and
+is not meant to be shared between threads.
+"""
+
+import time
+import cProfile
+from contextlib import contextmanager, nullcontext
+
+_active = None
+_NULL_PHASE = nullcontext()
+
+# Pseudo-phase for work done only for the profiler's sake (such as counting
+# tree nodes); its time is excluded from the enclosing phase and the report.
+OVERHEAD = None
+
+
+class Profiler:
+    """
+    Collects phase timings and counters while active.
+
+    Args:
+        callback: Optional function called as callback(phase, seconds) each
+            time a phase ends, with the phase's wall time including nested
+            phases
+        collect_stats: Also run cProfile during each phase, so that
+            dump_stats() can write the function-level profile of a phase
+    """
+
+    def __init__(self, callback=None, collect_stats=False):
+        self.callback = callback
+        self.collect_stats = collect_stats
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self._stack = []  # [phase, start time, time spent in nested phases]
+        self._stats = {}
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous
+        self._previous = None
+
+    def _switch_stats(self, from_phase, to_phase):
+        """Move cProfile collection from one phase to another."""
+        if from_phase is not None:
+            self._stats[from_phase].disable()
+        if to_phase is not None:
+            stats = self._stats.get(to_phase)
+            if stats is None:
+                stats = self._stats[to_phase] = cProfile.Profile()
+            stats.enable()
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase (name OVERHEAD for untracked profiler work)."""
+        outer = self._stack[-1][0] if self._stack else None
+        if self.collect_stats:
+            self._switch_stats(outer, name)
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][2] += elapsed
+            if self.collect_stats:
+                self._switch_stats(name, outer)
+            if name is not OVERHEAD:
+                self.seconds[name] = self.seconds.get(name, 0.0) + elapsed - frame[2]
+                self.calls[name] = self.calls.get(name, 0) + 1
+                if self.callback is not None:
+                    self.callback(name, elapsed)
+
+    def count(self, name, amount=1):
+        """Add to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        """Return the timings and counters as a JSON-serializable dictionary."""
+        return {
+            'phases': {name: {'seconds': self.seconds[name], 'calls': self.calls[name]}
+                       for name in self.seconds},
+            'counters': dict(self.counters),
+        }
+
+    def merge(self, report):
+        """Add a report from another profiler (e.g. one run in a worker process)."""
+        for name, phase in report['phases'].items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + phase['seconds']
+            self.calls[name] = self.calls.get(name, 0) + phase['calls']
+        for name, amount in report['counters'].items():
+            self.count(name, amount)
+
+    def hot_phase(self):
+        """Return the phase with the most self time, or None if nothing was timed."""
+        if not self.seconds:
+            return None
+        return max(self.seconds, key=self.seconds.get)
+
+    def format_report(self):
+        """Return a human-readable breakdown of phases and counters."""
+        total = sum(self.seconds.values())
+        lines = [f"{'phase':<12} {'seconds':>10} {'share':>7} {'calls':>8}"]
+        for name in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            share = self.seconds[name] / total if total else 0.0
+            lines.append(f"{name:<12} {self.seconds[name]:>10.4f} {share:>7.1%} {self.calls[name]:>8}")
+        lines.append(f"{'total':<12} {total:>10.4f}")
+        if self.counters:
+            lines.append('')
+            for name in sorted(self.counters):
+                lines.append(f"{name:<16} {self.counters[name]:>12}")
+        return '\n'.join(lines)
+
+    def dump_stats(self, path, phase=None):
+        """
+        Write the cProfile stats of a phase (default: the hot phase).
+
+        Returns:
+            The phase whose stats were written, or None if none were collected
+        """
+        phase = phase or self.hot_phase()
+        stats = self._stats.get(phase)
+        if stats is None:
+            return None
+        stats.dump_stats(path)
+        return phase
+
+
+def active():
+    """Return the active Profiler, or None."""
+    return _active
+
+
+def phase(name):
+    """Context manager timing a phase on the active profiler, if any."""
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)
+
+
+def count(name, amount=1):
+    """Add to a counter of the active profiler, if any."""
+    if _active is not None:
+        _active.count(name, amount)
@@ -0,0 +1,487 @@
+"""
+Python parser for PyCodeLens.
+
+Imported only when a Python file is analyzed. astroid is imported only when
+the 'astroid' engine is used, so the 'ast' engine starts up faster too.
+"""
+
+import os
+import ast
+
+from . import profiling
+from .analyzer import (ELEMENT_KINDS, ELEMENT_TYPE_KINDS, PYTHON_ENGINES, BaseCodeParser, ClassElement,
+                       CodeElement, Decorator, FunctionElement, PrintCall, normalize_want)
+
+
+class _StopWalk(Exception):
+    """Raised by the visitor to end the walk once the element it looks for is complete."""
+
+
+# Node types whose lists of statements may contain function and class definitions
+_STATEMENT_CONTAINERS = (ast.stmt, ast.excepthandler) + ((ast.match_case,) if hasattr(ast, 'match_case') else ())
+
+
+class _PythonElementVisitor(ast.NodeVisitor):
+    """
+    Collects functions, classes, methods, decorators and print calls from a
+    stdlib ast tree in a single walk.
+    
+    Children are visited in the same order as astroid's nodes_of_class(), so
+    the results are identical to PythonParser's astroid engine.
+    
+    Only the kinds in `want` are collected. Definitions are statements, so
+    expressions are walked only when print calls are wanted. With `find`
+    set to (kind, name), the walk stops as soon as the first function or
+    class matching the plain or qualified name is complete.
+    """
+    
+    def __init__(self, parser, want=frozenset(ELEMENT_KINDS), find=None):
+        self.parser = parser
+        self.want = want
+        self.find = find
+        self.found = None
+        self.functions = []
+        self.decorators = []
+        self.classes = []
+        self.print_calls = []
+        self._walk_expressions = 'print_calls' in want
+        # Records of the classes enclosing the node being visited
+        self._class_stack = []
+        # Names of the functions and classes enclosing the node being visited
+        self._scope = []
+    
+    def _visit_all(self, nodes):
+        for node in nodes:
+            if node is not None:
+                self.visit(node)
+    
+    def _check_found(self, kind, element):
+        if self.find is not None and self.found is None and self.find[0] == kind:
+            if self.find[1] in (element.name, element.qualname):
+                self.found = element
+    
+    def generic_visit(self, node):
+        if self._walk_expressions:
+            super().generic_visit(node)
+            return
+        for _, value in ast.iter_fields(node):
+            if isinstance(value, list):
+                self._visit_all(item for item in value if isinstance(item, _STATEMENT_CONTAINERS))
+    
+    def visit_FunctionDef(self, node):
+        # Like astroid, a decorated function starts at its first decorator
+        line_start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        qualname = '.'.join(self._scope + [node.name])
+        source = self.parser.source
+        func_info = FunctionElement(source, node.name, qualname, line_start, node.end_lineno)
+        
+        for decorator in node.decorator_list:
+            decorator_name = ""
+            if isinstance(decorator, ast.Name):
+                decorator_name = decorator.id
+            elif isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name):
+                decorator_name = decorator.func.id
+                
+            if decorator_name:
+                decorator_info = Decorator(decorator_name, decorator.lineno, node.name)
+                func_info.decorators.append(decorator_info)
+                self.decorators.append(decorator_info)
+        
+        self.functions.append(func_info)
+        self._check_found('functions', func_info)
+        
+        # Every enclosing class lists the function among its methods
+        for class_info in self._class_stack:
+            class_info.methods.append(CodeElement(source, node.name, qualname, line_start, node.end_lineno))
+        
+        self._scope.append(node.name)
+        if self._walk_expressions:
+            self._visit_all(node.decorator_list)
+            self.visit(node.args)
+            self._visit_all([node.returns])
+            self._visit_all(getattr(node, 'type_params', ()))
+        self._visit_all(node.body)
+        self._scope.pop()
+        if self.found is func_info:
+            raise _StopWalk
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_ClassDef(self, node):
+        class_info = ClassElement(self.parser.source, node.name, '.'.join(self._scope + [node.name]),
+                                  node.lineno, node.end_lineno)
+        self.classes.append(class_info)
+        self._check_found('classes', class_info)
+        
+        self._scope.append(node.name)
+        if self._walk_expressions:
+            self._visit_all(node.decorator_list)
+            self._visit_all(node.bases)
+            # astroid keeps the metaclass out of ClassDef.keywords and never
+            # walks it, so calls in it are left out here too
+            self._visit_all(keyword for keyword in node.keywords if keyword.arg != 'metaclass')
+            self._visit_all(getattr(node, 'type_params', ()))
+        # Methods are only recorded for wanted classes
+        if 'classes' in self.want:
+            self._class_stack.append(class_info)
+        self._visit_all(node.body)
+        if 'classes' in self.want:
+            self._class_stack.pop()
+        self._scope.pop()
+        if self.found is class_info:
+            raise _StopWalk
+    
+    def visit_arguments(self, node):
+        self._visit_all(arg.annotation for arg in node.posonlyargs)
+        self._visit_all(node.defaults)
+        self._visit_all(node.kw_defaults)
+        self._visit_all(arg.annotation for arg in node.args)
+        self._visit_all(arg.annotation for arg in (node.vararg, node.kwarg) if arg is not None)
+        self._visit_all(arg.annotation for arg in node.kwonlyargs)
+    
+    def visit_Dict(self, node):
+        for key, value in zip(node.keys, node.values):
+            self._visit_all((key, value))
+    
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id == 'print':
+            self.print_calls.append(PrintCall(node.lineno, len(node.args)))
+        self.generic_visit(node)
+    
+    def results(self):
+        """Return the collected lists of the wanted kinds."""
+        return {kind: getattr(self, kind) for kind in ('functions', 'decorators', 'classes', 'print_calls')
+                if kind in self.want}
+
+
+def _dotted_name(node):
+    """'a.b.c' for a chain of attributes on a name, else None (such as for calls on call results)."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _dotted_name(node.value)
+        return f"{base}.{node.attr}" if base is not None else None
+    return None
+
+
+# Nodes that cannot contain calls; the call visitor does not descend into them
+_CALL_FREE_NODES = (ast.Name, ast.Constant, ast.expr_context, ast.operator, ast.unaryop,
+                    ast.cmpop, ast.boolop, ast.alias)
+
+
+class _CallVisitor(ast.NodeVisitor):
+    """
+    Collects the function and class definitions, imports and calls of a
+    stdlib ast tree for call graphs.
+    
+    Each call is recorded with the scope it is made in: the tuple of
+    (name, is_class) pairs of its enclosing functions and classes.
+    Decorators, default values and base classes belong to the enclosing
+    scope, as they are evaluated there.
+    
+    Every expression is walked, so visit() and generic_visit() are
+    streamlined versions of NodeVisitor's.
+    """
+    
+    # Node type -> unbound visit method, shared by all instances
+    _handlers = {}
+    
+    def __init__(self):
+        # (qualname, kind, line_start, line_end), kind being 'function' or 'class'
+        self.definitions = []
+        # (scope, dotted callee name as written, line)
+        self.calls = []
+        # Local name -> (relative import level, dotted name it is bound to)
+        self.imports = {}
+        self._scope = ()
+    
+    def _visit_all(self, nodes):
+        for node in nodes:
+            if node is not None:
+                self.visit(node)
+    
+    def visit(self, node):
+        handler = self._handlers.get(type(node))
+        if handler is None:
+            handler = getattr(_CallVisitor, 'visit_' + type(node).__name__, _CallVisitor.generic_visit)
+            self._handlers[type(node)] = handler
+        handler(self, node)
+    
+    def generic_visit(self, node):
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, _CALL_FREE_NODES):
+                        self.visit(item)
+            elif isinstance(value, ast.AST) and not isinstance(value, _CALL_FREE_NODES):
+                self.visit(value)
+    
+    def _visit_body(self, node, is_class):
+        outer = self._scope
+        self._scope = outer + ((node.name, is_class),)
+        self._visit_all(node.body)
+        self._scope = outer
+    
+    def _qualname(self, node):
+        return '.'.join([name for name, _ in self._scope] + [node.name])
+    
+    def visit_FunctionDef(self, node):
+        line_start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        self.definitions.append((self._qualname(node), 'function', line_start, node.end_lineno))
+        self._visit_all(node.decorator_list)
+        self.visit(node.args)
+        self._visit_all([node.returns])
+        self._visit_body(node, False)
+    
+    visit_AsyncFunctionDef = visit_FunctionDef
+    
+    def visit_ClassDef(self, node):
+        self.definitions.append((self._qualname(node), 'class', node.lineno, node.end_lineno))
+        self._visit_all(node.decorator_list)
+        self._visit_all(node.bases)
+        self._visit_all(node.keywords)
+        self._visit_body(node, True)
+    
+    def visit_Import(self, node):
+        for alias in node.names:
+            if alias.asname:
+                self.imports[alias.asname] = (0, alias.name)
+            else:
+                # `import a.b` binds `a`
+                top = alias.name.partition('.')[0]
+                self.imports[top] = (0, top)
+    
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name != '*':
+                target = f"{node.module}.{alias.name}" if node.module else alias.name
+                self.imports[alias.asname or alias.name] = (node.level, target)
+    
+    def visit_Call(self, node):
+        callee = _dotted_name(node.func)
+        if callee is not None:
+            self.calls.append((self._scope, callee, node.lineno))
+        self.generic_visit(node)
+
+
+def _astroid_qualname(node):
+    """Dotted name of an astroid function or class within its module."""
+    import astroid
+    
+    names = [node.name]
+    parent = node.parent
+    while parent is not None:
+        if isinstance(parent, (astroid.FunctionDef, astroid.ClassDef)):
+            names.append(parent.name)
+        parent = parent.parent
+    return '.'.join(reversed(names))
+
+
+class PythonParser(BaseCodeParser):
+    """
+    Parser for Python code.
+    
+    The default 'astroid' engine builds an astroid tree; the 'ast' engine
+    uses the standard library parser and a single-pass visitor, which is
+    faster and produces the same results.
+    """
+    
+    def __init__(self, file_path, engine='astroid', code=None):
+        if engine not in PYTHON_ENGINES:
+            raise ValueError(f"Unsupported Python engine: {engine}")
+        super().__init__(file_path, code)
+        self.engine = engine
+    
+    def extract_elements(self, want=None):
+        """Extract code elements (only the kinds in want, if given) from Python file."""
+        want = normalize_want(want)
+        if self.engine == 'ast':
+            return self._extract_with_ast(want)
+        return self._extract_with_astroid(want)
+    
+    def find_first(self, name, element_type='function'):
+        """Find the first function or class matching a name, stopping the walk there."""
+        kind = ELEMENT_TYPE_KINDS.get(element_type)
+        if kind not in ('functions', 'classes'):
+            return None
+        if self.engine == 'ast':
+            visitor = _PythonElementVisitor(self, frozenset([kind]), find=(kind, name))
+            try:
+                visitor.visit(self._parse_with_ast())
+            except _StopWalk:
+                pass
+            return visitor.found
+        
+        import astroid
+        
+        module = self._parse_with_astroid()
+        if kind == 'functions':
+            node_class, make_record = astroid.FunctionDef, self._astroid_function
+        else:
+            node_class, make_record = astroid.ClassDef, self._astroid_class
+        plain_name = name.rpartition('.')[2]
+        for node in module.nodes_of_class(node_class):
+            if node.name == plain_name and (node.name == name or _astroid_qualname(node) == name):
+                return make_record(node)
+        return None
+    
+    def extract_calls(self, module_name=None):
+        """
+        Extract the definitions and the calls between them, for call graphs.
+        
+        Calls are resolved by name, without inference: a callee that names a
+        function or class visible from the caller, or a name imported into
+        the module (through any alias), is qualified with its module; other
+        callees (builtins, parameters, attributes of values) are kept as
+        written. `self.name` and `cls.name` resolve to methods of the
+        enclosing class. The stdlib ast module is used with either engine.
+        
+        Args:
+            module_name: Dotted name of the module, used to qualify names and
+                resolve relative imports (defaults to the file name's stem)
+        
+        Returns:
+            Dictionary with 'module', 'definitions' (tuples of qualified name,
+            kind, line_start and line_end) and 'calls' (tuples of caller,
+            callee and line). The caller is the innermost enclosing function
+            or class, or the module itself for top-level code.
+        """
+        if module_name is None:
+            module_name = os.path.splitext(os.path.basename(self.file_path))[0]
+        visitor = _CallVisitor()
+        visitor.visit(self._parse_with_ast())
+        
+        defined = {qualname for qualname, _, _, _ in visitor.definitions}
+        # Package that relative imports of level 1 refer to
+        package = module_name.split('.')
+        if os.path.basename(self.file_path) != '__init__.py':
+            package = package[:-1]
+        imports = {}
+        for name, (level, target) in visitor.imports.items():
+            if level:
+                base = package[:len(package) - (level - 1)] if level > 1 else package
+                target = '.'.join(base + [target])
+            imports[name] = target
+        
+        resolved = {}
+        calls = []
+        for scope, callee, line in visitor.calls:
+            key = (scope, callee)
+            if key not in resolved:
+                resolved[key] = self._resolve_call(scope, callee, module_name, defined, imports)
+            names = [name for name, _ in scope]
+            caller = '.'.join([module_name] + names)
+            calls.append((caller, resolved[key], line))
+        
+        definitions = [(f"{module_name}.{qualname}", kind, line_start, line_end)
+                       for qualname, kind, line_start, line_end in visitor.definitions]
+        return {'module': module_name, 'definitions': definitions, 'calls': calls}
+    
+    @staticmethod
+    def _resolve_call(scope, callee, module_name, defined, imports):
+        """Qualify a callee name as seen from a scope (see extract_calls)."""
+        first, dot, rest = callee.partition('.')
+        names = [name for name, _ in scope]
+        if first in ('self', 'cls') and rest:
+            # Methods of the innermost enclosing class
+            for depth in range(len(scope), 0, -1):
+                if scope[depth - 1][1]:
+                    candidate = '.'.join(names[:depth] + [rest])
+                    if candidate in defined:
+                        return f"{module_name}.{candidate}"
+                    break
+            return callee
+        # Innermost scope first; names defined in a class body are not
+        # visible from the functions nested in it
+        for depth in range(len(scope), -1, -1):
+            if depth and depth < len(scope) and scope[depth - 1][1]:
+                continue
+            if '.'.join(names[:depth] + [first]) in defined:
+                return '.'.join([module_name] + names[:depth] + [callee])
+        if first in imports:
+            return imports[first] + dot + rest
+        return callee
+    
+    def _parse_with_ast(self):
+        with profiling.phase('parse'):
+            module = ast.parse(self.code, self.file_path)
+        if profiling.active():
+            with profiling.phase(profiling.OVERHEAD):
+                profiling.count('nodes_visited', sum(1 for _ in ast.walk(module)))
+        return module
+    
+    def _parse_with_astroid(self):
+        # Imported here: astroid is slow to import and the ast engine does not need it
+        import astroid
+        
+        with profiling.phase('parse'):
+            module = astroid.parse(self.code, self.file_path)
+        if profiling.active():
+            with profiling.phase(profiling.OVERHEAD):
+                profiling.count('nodes_visited', sum(1 for _ in module.nodes_of_class(astroid.NodeNG)))
+        return module
+    
+    def _extract_with_ast(self, want):
+        """Extract code elements with the stdlib ast module."""
+        visitor = _PythonElementVisitor(self, want)
+        visitor.visit(self._parse_with_ast())
+        return visitor.results()
+    
+    def _astroid_function(self, node):
+        """Build the record of an astroid function, with its decorators."""
+        import astroid
+        
+        func_info = FunctionElement(self.source, node.name, _astroid_qualname(node),
+                                    node.lineno, node.end_lineno)
+        if node.decorators:
+            for decorator in node.decorators.nodes:
+                decorator_name = ""
+                if isinstance(decorator, astroid.Name):
+                    decorator_name = decorator.name
+                elif isinstance(decorator, astroid.Call) and isinstance(decorator.func, astroid.Name):
+                    decorator_name = decorator.func.name
+                    
+                if decorator_name:
+                    func_info.decorators.append(Decorator(decorator_name, decorator.lineno, node.name))
+        return func_info
+    
+    def _astroid_class(self, node):
+        """Build the record of an astroid class, with its methods."""
+        import astroid
+        
+        class_info = ClassElement(self.source, node.name, _astroid_qualname(node),
+                                  node.lineno, node.end_lineno)
+        for method_node in node.nodes_of_class(astroid.FunctionDef):
+            class_info.methods.append(CodeElement(self.source, method_node.name, _astroid_qualname(method_node),
+                                                  method_node.lineno, method_node.end_lineno))
+        return class_info
+    
+    def _extract_with_astroid(self, want):
+        """Extract code elements with astroid, walking the tree only for the wanted kinds."""
+        import astroid
+        
+        module = self._parse_with_astroid()
+        results = {}
+        
+        # Extract functions and their details
+        if 'functions' in want or 'decorators' in want:
+            functions = [self._astroid_function(node) for node in module.nodes_of_class(astroid.FunctionDef)]
+            if 'functions' in want:
+                results['functions'] = functions
+            if 'decorators' in want:
+                # The same records as listed with each function
+                results['decorators'] = [decorator for func_info in functions
+                                         for decorator in func_info.decorators]
+        
+        # Extract classes
+        if 'classes' in want:
+            results['classes'] = [self._astroid_class(node) for node in module.nodes_of_class(astroid.ClassDef)]
+        
+        # Extract print statements
+        if 'print_calls' in want:
+            results['print_calls'] = [PrintCall(node.lineno, len(node.args))
+                                      for node in module.nodes_of_class(astroid.Call)
+                                      if isinstance(node.func, astroid.Name) and node.func.name == 'print']
+        
+        return results
@@ -0,0 +1,318 @@
+"""
+SQLite symbol index of a repository for PyCodeLens.
+
+`pycodelens index` extracts every function, method, class, interface and
+decorator below a directory into a local SQLite database, and `pycodelens
+find` answers questions such as "which file defines X" or "which functions
+are decorated with @Y" from it without parsing anything.
+
+Updates are incremental: a file is re-read only when its modification time
+or size changed, and re-extracted only when its content hash changed too.
+"""
+
+import os
+import time
+import sqlite3
+
+from . import __version__
+from .analyzer import decode_source, extract_code_elements, is_glob_pattern, iter_elements
+from .scanner import DEFAULT_EXCLUDE_DIRS, iter_source_files, pool_map
+
+DEFAULT_INDEX_PATH = '.pycodelens_index.db'
+
+# Bumped whenever the tables change; an index with another version is rebuilt
+SCHEMA_VERSION = 1
+
+# Symbol kinds stored in the index
+SYMBOL_KINDS = ('function', 'method', 'class', 'interface')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    parser TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    line_start INTEGER NOT NULL,
+    line_end INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS decorators (
+    symbol_id INTEGER NOT NULL REFERENCES symbols(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols(qualname);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols(file_id);
+CREATE INDEX IF NOT EXISTS decorators_name ON decorators(name);
+CREATE INDEX IF NOT EXISTS decorators_symbol ON decorators(symbol_id);
+"""
+
+
+def _parser_id(engine):
+    """Identify what produced a file's symbols; other versions or engines force a re-extraction."""
+    return f"{__version__}:{engine or 'astroid'}"
+
+
+def _extract_symbols(task):
+    """
+    Hash a file and, if its content changed, extract its symbols.
+
+    The hash is taken over the file's bytes before anything is parsed, and
+    the same bytes are then parsed, so a file is read once and parsed only
+    when it changed. Runs in worker processes, so it takes and returns plain
+    tuples.
+
+    Returns:
+        Tuple (path, sha256, symbols, error); symbols is None when the hash
+        matches the known one, else a list of (kind, name, qualname,
+        line_start, line_end, content_hash, decorators) with decorators as
+        (name, line) pairs
+    """
+    # Imported here: hashlib is only needed while indexing
+    import hashlib
+
+    file_path, known_hash, engine = task
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if sha256 == known_hash:
+            return file_path, sha256, None, None
+
+        results = extract_code_elements(file_path, engine=engine, want=('functions', 'classes', 'interfaces'),
+                                        code=decode_source(data), records=True)
+
+        class_qualnames = {cls['qualname'] for cls in results.get('classes', [])}
+        symbols = []
+        for element_type, element in iter_elements(results):
+            kind = element_type
+            if kind == 'function' and element['qualname'].rpartition('.')[0] in class_qualnames:
+                kind = 'method'
+            content_hash = hashlib.sha1(element['source_code'].encode('utf-8', 'surrogatepass')).hexdigest()
+            decorators = [(d['name'], d['line']) for d in element.get('decorators', [])]
+            symbols.append((kind, element['name'], element['qualname'], element['line_start'],
+                            element['line_end'], content_hash, decorators))
+        return file_path, sha256, symbols, None
+    except Exception as e:
+        return file_path, None, None, str(e)
+
+
+class RepoIndex:
+    """
+    SQLite database of the symbols of one or more source trees.
+
+    Paths are stored absolute, so the index answers the same wherever it is
+    queried from.
+    """
+
+    def __init__(self, db_path=DEFAULT_INDEX_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self._ensure_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _ensure_schema(self):
+        version = None
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'meta'").fetchone():
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            version = row['value'] if row is not None else None
+        if version == str(SCHEMA_VERSION):
+            return
+        # New database or another layout: start over
+        for table in ('decorators', 'symbols', 'files', 'meta'):
+            self.conn.execute(f'DROP TABLE IF EXISTS {table}')
+        self.conn.executescript(_SCHEMA)
+        with self.conn:
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+
+    def update(self, root, engine=None, workers=None, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+        """
+        Bring the index up to date with the files below a directory.
+
+        Files whose modification time and size are unchanged are skipped
+        without being read; files that changed are hashed and re-extracted
+        only if their content differs. Indexed files below root that no
+        longer exist are removed.
+
+        Args:
+            root: Directory (or single file) to index
+            engine: Python parsing engine ('astroid' or 'ast')
+            workers: Worker processes for extraction (defaults to the CPU
+                count; 0 or 1 extracts in the current process)
+            exclude_dirs: Directory names to skip while walking
+
+        Returns:
+            Dictionary with the number of files 'scanned', 'updated',
+            'unchanged' and 'removed', the total number of 'symbols' and
+            'errors' as a list of (path, message)
+        """
+        root = os.path.abspath(root)
+        parser_id = _parser_id(engine)
+        known = {row['path']: row for row in self.conn.execute('SELECT * FROM files')}
+        stats = {'scanned': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'errors': []}
+
+        stamps = {}
+        tasks = []
+        for file_path in iter_source_files(root, exclude_dirs):
+            file_path = os.path.abspath(file_path)
+            stats['scanned'] += 1
+            try:
+                st = os.stat(file_path)
+            except OSError as e:
+                stats['errors'].append((file_path, str(e)))
+                continue
+            stamps[file_path] = (st.st_mtime_ns, st.st_size)
+            row = known.get(file_path)
+            if row is not None and row['parser'] == parser_id and \
+                    (row['mtime_ns'], row['size']) == stamps[file_path]:
+                stats['unchanged'] += 1
+                continue
+            known_hash = row['sha256'] if row is not None and row['parser'] == parser_id else None
+            tasks.append((file_path, known_hash, engine))
+
+        with self.conn:
+            for file_path, sha256, symbols, error in pool_map(_extract_symbols, tasks, workers):
+                if error is not None:
+                    # Its old symbols may no longer exist
+                    self.conn.execute('DELETE FROM files WHERE path = ?', (file_path,))
+                    stats['errors'].append((file_path, error))
+                    continue
+                mtime_ns, size = stamps[file_path]
+                if symbols is None:
+                    # Touched but not modified: only the stamp changes
+                    self.conn.execute('UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?',
+                                      (mtime_ns, size, file_path))
+                    stats['unchanged'] += 1
+                    continue
+                self._store(file_path, mtime_ns, size, sha256, parser_id, symbols)
+                stats['updated'] += 1
+
+            prefix = root.rstrip(os.sep) + os.sep
+            for path in known:
+                if (path == root or path.startswith(prefix)) and path not in stamps:
+                    self.conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                    stats['removed'] += 1
+
+        stats['symbols'] = self.conn.execute('SELECT COUNT(*) FROM symbols').fetchone()[0]
+        return stats
+
+    def _store(self, file_path, mtime_ns, size, sha256, parser_id, symbols):
+        """Replace the stored symbols of one file."""
+        self.conn.execute('DELETE FROM files WHERE path = ?', (file_path,))
+        file_id = self.conn.execute(
+            'INSERT INTO files (path, mtime_ns, size, sha256, parser) VALUES (?, ?, ?, ?, ?)',
+            (file_path, mtime_ns, size, sha256, parser_id)).lastrowid
+        for kind, name, qualname, line_start, line_end, content_hash, decorators in symbols:
+            symbol_id = self.conn.execute(
+                'INSERT INTO symbols (file_id, kind, name, qualname, line_start, line_end, content_hash) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (file_id, kind, name, qualname, line_start, line_end, content_hash)).lastrowid
+            if decorators:
+                self.conn.executemany('INSERT INTO decorators (symbol_id, name, line) VALUES (?, ?, ?)',
+                                      [(symbol_id, dec_name, line) for dec_name, line in decorators])
+
+    def find(self, name=None, kind=None, decorator=None, file=None):
+        """
+        Look up symbols.
+
+        Args:
+            name: Plain or qualified name; may be a glob pattern such as
+                'test_*' or 'Widget.*'
+            kind: 'function' (functions and methods), 'method', 'class' or
+                'interface'
+            decorator: Only symbols with a decorator of this name (or glob)
+            file: Only symbols of this file
+
+        Returns:
+            List of dictionaries with 'file', 'kind', 'name', 'qualname',
+            'line_start', 'line_end', 'content_hash' and 'decorators',
+            ordered by file and line
+        """
+        clauses = []
+        params = []
+        if name is not None:
+            if is_glob_pattern(name):
+                clauses.append('(symbols.name GLOB ? OR symbols.qualname GLOB ?)')
+            else:
+                clauses.append('(symbols.name = ? OR symbols.qualname = ?)')
+            params += [name, name]
+        if kind == 'function':
+            clauses.append("symbols.kind IN ('function', 'method')")
+        elif kind is not None:
+            clauses.append('symbols.kind = ?')
+            params.append(kind)
+        if decorator is not None:
+            operator = 'GLOB' if is_glob_pattern(decorator) else '='
+            clauses.append(f'symbols.id IN (SELECT symbol_id FROM decorators WHERE name {operator} ?)')
+            params.append(decorator.lstrip('@'))
+        if file is not None:
+            clauses.append('files.path = ?')
+            params.append(os.path.abspath(file))
+
+        joins = 'FROM symbols JOIN files ON files.id = symbols.file_id'
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+
+        matches = []
+        by_id = {}
+        query = (f'SELECT symbols.id, files.path AS file, symbols.kind, symbols.name, symbols.qualname, '
+                 f'symbols.line_start, symbols.line_end, symbols.content_hash {joins}{where} '
+                 f'ORDER BY files.path, symbols.line_start, symbols.id')
+        for row in self.conn.execute(query, params):
+            match = {key: row[key] for key in row.keys() if key != 'id'}
+            match['decorators'] = []
+            by_id[row['id']] = match
+            matches.append(match)
+        if by_id:
+            # The decorators of all matches in a second query with the same filters
+            query = (f'SELECT decorators.symbol_id, decorators.name, decorators.line '
+                     f'FROM decorators JOIN symbols ON symbols.id = decorators.symbol_id '
+                     f'JOIN files ON files.id = symbols.file_id{where} ORDER BY decorators.line')
+            for row in self.conn.execute(query, params):
+                by_id[row['symbol_id']]['decorators'].append({'name': row['name'], 'line': row['line']})
+        return matches
+
+    def stats(self):
+        """Return the number of indexed files and symbols."""
+        return {
+            'files': self.conn.execute('SELECT COUNT(*) FROM files').fetchone()[0],
+            'symbols': self.conn.execute('SELECT COUNT(*) FROM symbols').fetchone()[0],
+        }
+
+
+def index_tree(root, db_path=DEFAULT_INDEX_PATH, engine=None, workers=None,
+               exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Create or update the index of a directory tree.
+
+    Returns:
+        The statistics of RepoIndex.update(), plus the elapsed 'seconds'
+    """
+    start = time.perf_counter()
+    with RepoIndex(db_path) as index:
+        stats = index.update(root, engine, workers, exclude_dirs)
+    stats['seconds'] = time.perf_counter() - start
+    return stats
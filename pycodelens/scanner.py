@@ -0,0 +1,334 @@
+"""
+Whole-repository analysis for PyCodeLens.
+
+Walks a directory tree and runs the per-file analyzer over every supported
+source file, optionally spreading the work across a pool of worker processes.
+
+Files over a size limit are skipped, files that take too long are abandoned
+after a per-file timeout, and the largest files are dispatched first so that
+one big file started last does not leave the other workers idle.
+"""
+
+import os
+import time
+from collections import deque
+
+from . import profiling
+from .analyzer import analyze_file, is_supported_file
+from .cache import DEFAULT_MAX_BYTES, get_cache
+
+# Directory names that are never descended into while walking a tree.
+DEFAULT_EXCLUDE_DIRS = frozenset([
+    '.git', '.hg', '.svn', '.tox', '.nox', '.venv', 'venv',
+    '__pycache__', 'node_modules', '.mypy_cache', '.pytest_cache',
+])
+
+
+def iter_source_files(root, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Yield paths of all supported source files below a directory.
+
+    Args:
+        root: Directory to walk (a single file is yielded as-is)
+        exclude_dirs: Directory names to skip entirely
+
+    Yields:
+        File paths in a stable, sorted order
+    """
+    if os.path.isfile(root):
+        yield root
+        return
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in exclude_dirs)
+        for filename in sorted(filenames):
+            if is_supported_file(filename):
+                yield os.path.join(dirpath, filename)
+
+
+def _analyze_file(file_path, options):
+    cache = None
+    if options['cache_dir']:
+        cache = get_cache(options['cache_dir'], options['cache_max_bytes'])
+    try:
+        analysis = analyze_file(file_path, cache, options['engine'], options['want'], options['summary'],
+                                options['records'])
+    except Exception as e:
+        return {'file': file_path, 'status': 'error', 'error': str(e)}
+
+    # The parser is only useful in the process that created it
+    analysis['raw_results'].pop('_parser')
+    return {'file': file_path, 'status': 'ok', 'analysis': analysis}
+
+
+def _analyze_one(task):
+    """Analyze a single file, capturing failures instead of raising."""
+    file_path, options = task
+    if options.get('profile'):
+        # Running in a worker: profile locally and send the report back
+        with profiling.Profiler() as profiler:
+            result = _analyze_file(file_path, options)
+        result['profile'] = profiler.report()
+        return result
+    return _analyze_file(file_path, options)
+
+
+def _analyze_batch(batch):
+    return [_analyze_one(task) for task in batch]
+
+
+def _chunksize(num_files, workers):
+    """Pick a pool chunk size that amortizes IPC without starving workers."""
+    return max(1, min(64, num_files // (workers * 8)))
+
+
+def pool_map(function, tasks, workers=None, ordered=False, chunksize=None):
+    """
+    Run a function over tasks, spread across a pool of worker processes.
+
+    Args:
+        function: Module-level function taking one task
+        tasks: List of picklable tasks
+        workers: Number of worker processes (defaults to the CPU count; one
+            or fewer runs every task in this process)
+        ordered: Yield results in task order rather than as they complete
+        chunksize: Tasks sent to a worker at a time (default: picked from
+            the number of tasks and workers)
+
+    Yields:
+        The result of each task
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+
+    # Imported here: multiprocessing is slow to import and small runs never need it
+    import multiprocessing
+
+    if chunksize is None:
+        chunksize = _chunksize(len(tasks), workers)
+    with multiprocessing.Pool(workers) as pool:
+        if ordered:
+            yield from pool.imap(function, tasks, chunksize)
+        else:
+            yield from pool.imap_unordered(function, tasks, chunksize)
+
+
+def _timed_worker(conn):
+    """Worker process of _run_with_timeout(): analyze each batch received, sending one result per file."""
+    while True:
+        batch = conn.recv()
+        if batch is None:
+            return
+        for task in batch:
+            conn.send(_analyze_one(task))
+
+
+def _run_with_timeout(batches, workers, timeout):
+    """
+    Analyze batches of tasks in worker processes, abandoning any file that
+    takes longer than the timeout.
+
+    The deadlines are watched from this process, so a worker stuck in a
+    long call into C is abandoned as well: it is killed, its file reported
+    as timed out, and the rest of its batch handed to another worker.
+
+    Yields:
+        The result of each task, as it completes
+    """
+    # Imported here: multiprocessing is slow to import and single files never need it
+    import multiprocessing
+    from multiprocessing.connection import wait
+
+    def start():
+        conn, child_conn = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_timed_worker, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return conn, process
+
+    def replace(conn, process, remaining, result):
+        # Abandon the worker and its current file, and requeue the rest of its batch
+        del running[conn]
+        conn.close()
+        process.kill()
+        process.join()
+        if remaining[1:]:
+            pending.appendleft(remaining[1:])
+        return dict(result, file=remaining[0][0])
+
+    pending = deque(batches)
+    # Workers analyzing a batch: connection -> [process, tasks left, deadline]
+    running = {}
+    idle = []
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                conn, process = idle.pop() if idle else start()
+                batch = pending.popleft()
+                conn.send(batch)
+                running[conn] = [process, list(batch), time.monotonic() + timeout]
+
+            nearest = min(state[2] for state in running.values())
+            for conn in wait(list(running), max(0, nearest - time.monotonic())):
+                process, remaining, _ = state = running[conn]
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    # The worker died, say killed for running out of memory
+                    process.join()
+                    yield replace(conn, process, remaining, {
+                        'status': 'error', 'error': f"Worker process exited with code {process.exitcode}"})
+                    continue
+                remaining.pop(0)
+                if remaining:
+                    state[2] = time.monotonic() + timeout
+                else:
+                    del running[conn]
+                    idle.append((conn, process))
+                yield result
+
+            now = time.monotonic()
+            for conn, (process, remaining, deadline) in list(running.items()):
+                # A result already waiting was finished in time, however slowly it is collected
+                if deadline <= now and not conn.poll():
+                    yield replace(conn, process, remaining, {
+                        'status': 'timeout', 'error': f"Timed out after {timeout:g}s"})
+    finally:
+        for conn, process in idle:
+            try:
+                conn.send(None)
+            except OSError:
+                # Already gone; joining it below is enough
+                pass
+        for process, _, _ in running.values():
+            process.kill()
+        for conn, process in idle + [(conn, state[0]) for conn, state in running.items()]:
+            process.join()
+            conn.close()
+
+
+def _size_batches(tasks, sizes, workers):
+    """
+    Group tasks sorted by size, largest first, into batches of about equal
+    total size for the pool.
+
+    Every worker gets about eight batches, so large files travel alone and
+    the many small ones share IPC round trips, up to 64 files per batch.
+    """
+    target = max(1, sum(sizes) // (workers * 8))
+    batches = []
+    batch, batch_size = [], 0
+    for task, size in zip(tasks, sizes):
+        if batch and (batch_size + size > target or len(batch) >= 64):
+            batches.append(batch)
+            batch, batch_size = [], 0
+        batch.append(task)
+        batch_size += size
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def analyze_tree(root, workers=None, exclude_dirs=DEFAULT_EXCLUDE_DIRS,
+                 cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, engine=None, want=None, summary=True,
+                 max_file_size=None, timeout=None, largest_first=True, records=False):
+    """
+    Analyze every supported file below a directory.
+
+    Files are dispatched to a process pool and results are yielded as soon
+    as each one is finished, so the order is not deterministic when more
+    than one worker is used.
+
+    With a timeout, files are always analyzed in worker processes (at least
+    one), so that a file stuck even in a long call into C can be abandoned
+    by killing its worker.
+
+    Args:
+        root: Directory (or single file) to analyze
+        workers: Number of worker processes (defaults to the CPU count;
+            0 or 1 analyzes in the current process)
+        exclude_dirs: Directory names to skip while walking
+        cache_dir: Directory of a persistent result cache (disabled if None)
+        cache_max_bytes: Size limit of the result cache
+        engine: Python parsing engine ('astroid' or 'ast')
+        want: Element kinds to extract (see extract_code_elements)
+        summary: Whether to build each file's summary (see analyze_file)
+        max_file_size: Skip files larger than this many bytes (None: no limit)
+        timeout: Give up on a file after this many seconds (None: no limit)
+        largest_first: With several workers, start with the largest files
+            to shorten the total run time
+        records: Return elements as Records (see extract_code_elements)
+
+    Yields:
+        Dictionaries with 'file', 'status' ('ok', 'error', 'skipped' or
+        'timeout') and either 'analysis' (as returned by analyze_file) or
+        'error' describing the problem; skipped files also carry their 'size'
+    """
+    options = {
+        'cache_dir': cache_dir,
+        'cache_max_bytes': cache_max_bytes,
+        'engine': engine,
+        'want': want,
+        'summary': summary,
+        'records': records,
+    }
+    files = list(iter_source_files(root, exclude_dirs))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    sizes = None
+    if max_file_size is not None or (largest_first and min(workers, len(files)) > 1):
+        sizes = {}
+        for file_path in files:
+            try:
+                sizes[file_path] = os.stat(file_path).st_size
+            except OSError:
+                # Gone since listing; analyzing it reports the error
+                sizes[file_path] = 0
+    if max_file_size is not None:
+        kept = []
+        for file_path in files:
+            if sizes[file_path] > max_file_size:
+                yield {'file': file_path, 'status': 'skipped', 'size': sizes[file_path],
+                       'error': f"{sizes[file_path]} bytes is over the {max_file_size} byte limit"}
+            else:
+                kept.append(file_path)
+        files = kept
+
+    tasks = [(file_path, options) for file_path in files]
+    workers = min(workers, len(tasks))
+
+    if not tasks:
+        return
+    if workers <= 1 and not timeout:
+        for task in tasks:
+            yield _analyze_one(task)
+        return
+    workers = max(workers, 1)
+
+    # Workers cannot record into this process's profiler, so they return
+    # their own reports to be merged here
+    profiler = profiling.active()
+    if profiler is not None:
+        options = dict(options, profile=True)
+        tasks = [(file_path, options) for file_path, _ in tasks]
+
+    if largest_first and workers > 1:
+        tasks.sort(key=lambda task: sizes[task[0]], reverse=True)
+        batches = _size_batches(tasks, [sizes[file_path] for file_path, _ in tasks], workers)
+    else:
+        size = _chunksize(len(tasks), workers)
+        batches = [tasks[start:start + size] for start in range(0, len(tasks), size)]
+    if timeout:
+        results = _run_with_timeout(batches, workers, timeout)
+    else:
+        results = (result for batch in pool_map(_analyze_batch, batches, workers, chunksize=1) for result in batch)
+    for result in results:
+        report = result.pop('profile', None)
+        if report is not None:
+            profiler.merge(report)
+        yield result
@@ -0,0 +1,188 @@
+"""
+Watch mode for PyCodeLens.
+
+Polls a file or directory tree for changes (by modification time and size,
+so no platform-specific notification library is needed), re-analyzes only
+the files that changed and reports what changed in each of them as a delta
+of added, removed and moved functions, classes and interfaces.
+"""
+
+import os
+import time
+
+from .analyzer import extract_code_elements, iter_elements, without_source
+from .scanner import DEFAULT_EXCLUDE_DIRS, iter_source_files
+
+DEFAULT_INTERVAL = 1.0
+
+# Element kinds that deltas cover (methods are part of 'classes')
+DELTA_KINDS = ('functions', 'classes', 'interfaces')
+
+
+def element_key(element_type, element):
+    """Identity of an element across versions of a file: its type and qualified name."""
+    return element_type, element.get('qualname', element['name'])
+
+
+def _delta_record(element_type, element):
+    return {
+        'type': element_type,
+        'name': element['name'],
+        'qualname': element.get('qualname', element['name']),
+        'line_start': element['line_start'],
+        'line_end': element['line_end'],
+    }
+
+
+def diff_elements(old_results, new_results, compare_source=False):
+    """
+    Compare two versions of a file's results.
+
+    Elements are matched by type and qualified name; when several elements
+    share both (such as overloads), they are paired in source order.
+
+    Args:
+        old_results: Previous results (or None for a new file)
+        new_results: Current results (or None for a deleted file)
+        compare_source: Also compare the source code of matched elements;
+            both results must then still carry it
+
+    Returns:
+        Dictionary with 'added', 'removed' and 'moved' lists of element
+        records; moved records also carry 'old_line_start' and 'old_line_end'.
+        With compare_source, a 'modified' list holds the matched elements
+        whose source changed (also with the old lines); they are not
+        repeated in 'moved'.
+    """
+    old_elements = {}
+    for element_type, element in iter_elements(old_results or {}):
+        old_elements.setdefault(element_key(element_type, element), []).append(element)
+
+    delta = {'added': [], 'removed': [], 'moved': []}
+    if compare_source:
+        delta['modified'] = []
+    for element_type, element in iter_elements(new_results or {}):
+        candidates = old_elements.get(element_key(element_type, element))
+        if not candidates:
+            delta['added'].append(_delta_record(element_type, element))
+            continue
+        old = candidates.pop(0)
+        if compare_source and old['source_code'] != element['source_code']:
+            changes = delta['modified']
+        elif (old['line_start'], old['line_end']) != (element['line_start'], element['line_end']):
+            changes = delta['moved']
+        else:
+            continue
+        record = _delta_record(element_type, element)
+        record['old_line_start'] = old['line_start']
+        record['old_line_end'] = old['line_end']
+        changes.append(record)
+
+    for (element_type, _), elements in old_elements.items():
+        delta['removed'].extend(_delta_record(element_type, element) for element in elements)
+    delta['removed'].sort(key=lambda record: record['line_start'])
+    return delta
+
+
+def is_empty_delta(delta):
+    return not (delta['added'] or delta['removed'] or delta['moved'] or delta.get('modified'))
+
+
+class PollingWatcher:
+    """
+    Detects added, modified and deleted source files by polling.
+
+    Each poll stats every supported file below the root and compares its
+    modification time and size with the previous poll.
+    """
+
+    def __init__(self, root, exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+        self.root = root
+        self.exclude_dirs = exclude_dirs
+        self._stamps = {}
+
+    def _scan(self):
+        stamps = {}
+        for file_path in iter_source_files(self.root, self.exclude_dirs):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                # Deleted between listing and stat; it shows up as deleted
+                continue
+            stamps[file_path] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def poll(self):
+        """
+        Stat the tree and report what changed since the previous poll.
+
+        Returns:
+            Tuple (changed, deleted) of sorted file path lists; on the first
+            poll every file counts as changed
+        """
+        stamps = self._scan()
+        changed = sorted(path for path, stamp in stamps.items() if self._stamps.get(path) != stamp)
+        deleted = sorted(path for path in self._stamps if path not in stamps)
+        self._stamps = stamps
+        return changed, deleted
+
+
+def _snapshot(file_path, cache, engine):
+    """Extract a file's results, keeping only the fields needed for diffing."""
+    results = extract_code_elements(file_path, cache, engine, want=DELTA_KINDS, records=True)
+    return without_source({k: v for k, v in results.items() if not k.startswith('_')})
+
+
+def watch(root, interval=DEFAULT_INTERVAL, engine=None, cache=None,
+          exclude_dirs=DEFAULT_EXCLUDE_DIRS, initial=False, max_polls=None):
+    """
+    Watch a file or directory tree and yield per-file deltas as files change.
+
+    The previous results of every file are kept in memory; a poll re-parses
+    only the files whose modification time or size changed, and files whose
+    elements did not change produce no event.
+
+    Args:
+        root: File or directory to watch
+        interval: Seconds between polls
+        engine: Python parsing engine ('astroid' or 'ast')
+        cache: Optional ResultCache for extraction results
+        exclude_dirs: Directory names to skip entirely
+        initial: Also yield a delta for every file found by the first poll
+            (every element added); otherwise the first poll is a silent baseline
+        max_polls: Stop after this many polls (None: watch forever)
+
+    Yields:
+        Dictionaries with 'file' and 'status' ('added', 'modified', 'deleted'
+        or 'error'), plus the delta lists for successful analyses or 'error'
+    """
+    watcher = PollingWatcher(root, exclude_dirs)
+    snapshots = {}
+    polls = 0
+    while max_polls is None or polls < max_polls:
+        if polls:
+            time.sleep(interval)
+        first_poll = polls == 0
+        polls += 1
+
+        changed, deleted = watcher.poll()
+        for file_path in deleted:
+            old = snapshots.pop(file_path, None)
+            if old is not None:
+                yield dict({'file': file_path, 'status': 'deleted'}, **diff_elements(old, None))
+
+        for file_path in changed:
+            old = snapshots.get(file_path)
+            try:
+                new = _snapshot(file_path, cache, engine)
+            except Exception as e:
+                if not first_poll or initial:
+                    yield {'file': file_path, 'status': 'error', 'error': str(e)}
+                continue
+            snapshots[file_path] = new
+            if first_poll and not initial:
+                continue
+            delta = diff_elements(old, new)
+            if old is not None and is_empty_delta(delta):
+                continue
+            yield dict({'file': file_path, 'status': 'modified' if old is not None else 'added'}, **delta)
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from pycodelens.codemod import apply_manifest, load_manifest
+
+MODULE = '''\
+def retry():
+    return 1
+
+
+def main():
+    return retry()
+'''
+
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / 'src').mkdir()
+    for name in ('a.py', 'b.py'):
+        (tmp_path / 'src' / name).write_text(MODULE)
+    (tmp_path / 'src' / 'other.py').write_text('def main():\n    pass\n')
+    (tmp_path / 'retry.py').write_text('def retry():\n    return 2')
+    return tmp_path
+
+
+def write_manifest(tree, edits):
+    path = tree / 'manifest.json'
+    path.write_text(json.dumps(edits))
+    return str(path)
+
+
+def by_file(results):
+    return {result['file'].rsplit('/', 1)[-1]: result for result in results}
+
+
+def test_load_manifest_groups_edits_by_file(tree):
+    manifest = write_manifest(tree, [
+        {'files': ['src/*.py'], 'element_type': 'function', 'element_name': 'retry',
+         'replacement_file': 'retry.py', 'optional': True},
+        {'file': 'src/a.py', 'element_type': 'lines', 'element_name': '1-1',
+         'replacement_content': '# header'},
+    ])
+    plan = load_manifest(manifest)
+    assert [path.rsplit('/', 1)[-1] for path, _ in plan] == ['a.py', 'b.py', 'other.py']
+    assert len(plan[0][1]) == 2
+    assert plan[0][1][0]['replacement_content'] == 'def retry():\n    return 2'
+
+
+def test_dry_run_returns_diffs_and_writes_nothing(tree):
+    manifest = write_manifest(tree, [
+        {'files': ['src/*.py'], 'element_type': 'function', 'element_name': 'retry',
+         'replacement_file': 'retry.py', 'optional': True},
+    ])
+    results = by_file(apply_manifest(manifest, workers=1, dry_run=True))
+    assert results['a.py']['status'] == 'changed'
+    assert '-    return 1\n+    return 2\n' in results['a.py']['diff']
+    assert results['other.py']['status'] == 'unchanged'
+    assert 'diff' not in results['other.py']
+    assert (tree / 'src' / 'a.py').read_text() == MODULE
+
+
+def test_apply_writes_and_reports_applied_and_skipped_edits(tree):
+    manifest = write_manifest(tree, [
+        {'files': ['src/*.py'], 'element_type': 'function', 'element_name': 'retry',
+         'replacement_file': 'retry.py', 'optional': True},
+        {'files': ['src/*.py'], 'element_type': 'function', 'element_name': 'main',
+         'replacement_content': 'def main():\n    return 0'},
+    ])
+    results = by_file(apply_manifest(manifest, workers=2))
+    assert [(name, result['status'], result['edits'], result['skipped'])
+            for name, result in sorted(results.items())] == [
+        ('a.py', 'changed', 2, 0),
+        ('b.py', 'changed', 2, 0),
+        ('other.py', 'changed', 1, 1),
+    ]
+    assert 'return 2' in (tree / 'src' / 'b.py').read_text()
+    assert (tree / 'src' / 'other.py').read_text() == 'def main():\n    return 0\n'
+
+
+def test_failing_file_is_reported_and_left_untouched(tree):
+    manifest = write_manifest(tree, [
+        {'files': ['src/*.py'], 'element_type': 'function', 'element_name': 'retry',
+         'replacement_file': 'retry.py'},
+    ])
+    results = by_file(apply_manifest(manifest, workers=1))
+    assert results['a.py']['status'] == 'changed'
+    assert results['other.py']['status'] == 'failed'
+    assert "'retry'" in results['other.py']['error']
+    assert (tree / 'src' / 'other.py').read_text() == 'def main():\n    pass\n'
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from pycodelens.analyzer import extract_code_elements_from_string
+
+CASES = {
+    'class_bases': '''\
+class Base(print("base"), Mixin[print()]):
+    pass
+''',
+    'class_keywords': '''\
+class Model(Base, metaclass=print("meta"), flag=print(1, 2), **print()):
+    field = print("body")
+''',
+    'decorated_class_and_methods': '''\
+@register(print("decorator"))
+class Widget(Base, metaclass=Meta):
+    @property
+    def size(self):
+        return print(self)
+
+    @staticmethod
+    def build(x=print("default")) -> print("annotation"):
+        class Inner(print("inner base"), metaclass=print("inner meta")):
+            pass
+        return Inner
+''',
+    'nested_functions': '''\
+def outer():
+    def inner():
+        print("inner")
+    print("outer", inner())
+    return inner
+''',
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_engines_agree(name):
+    results = {}
+    for engine in ('astroid', 'ast'):
+        extracted = extract_code_elements_from_string(CASES[name], 'python', engine=engine)
+        results[engine] = json.dumps({key: value for key, value in extracted.items() if not key.startswith('_')})
+    assert results['ast'] == results['astroid']
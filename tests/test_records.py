@@ -0,0 +1,82 @@
+import json
+
+from pycodelens import analyze_file, analyze_source, analyze_tree, extract_code_elements_from_string
+from pycodelens.analyzer import Record, find_elements, json_default
+
+PYTHON_CODE = '''\
+def helper(x):
+    print("helper", x)
+    return x
+
+
+class Widget:
+    @property
+    def size(self):
+        return 1
+
+    def run(self):
+        return helper(self.size)
+'''
+
+JAVASCRIPT_CODE = '''\
+function add(a, b) {
+    return a + b;
+}
+
+class Counter {
+    increment() {
+        this.count += 1;
+    }
+}
+'''
+
+
+def public_results(raw_results):
+    return {key: value for key, value in raw_results.items() if not key.startswith('_')}
+
+
+def test_analyze_file_results_are_json_serializable(tmp_path):
+    path = tmp_path / 'module.py'
+    path.write_text(PYTHON_CODE)
+    analysis = analyze_file(str(path))
+    raw_results = public_results(analysis['raw_results'])
+
+    decoded = json.loads(json.dumps(raw_results))
+    assert [f['name'] for f in decoded['functions']] == ['helper', 'size', 'run']
+    assert decoded['classes'][0]['methods'][1]['source_code'].startswith('    def run(self):')
+    json.dumps(analysis['summary'])
+
+
+def test_public_elements_are_mutable_dicts():
+    results = extract_code_elements_from_string(PYTHON_CODE, 'python')
+    function = results['functions'][1]
+    assert type(function) is dict
+    assert type(function['decorators'][0]) is dict
+    function['note'] = 'checked'
+    assert function['note'] == 'checked'
+
+
+def test_analyze_source_and_tree_are_json_serializable(tmp_path):
+    analysis = analyze_source(JAVASCRIPT_CODE, 'javascript')
+    json.dumps(public_results(analysis['raw_results']))
+
+    (tmp_path / 'module.py').write_text(PYTHON_CODE)
+    (tmp_path / 'script.js').write_text(JAVASCRIPT_CODE)
+    results = list(analyze_tree(str(tmp_path), workers=1))
+    assert [result['status'] for result in results] == ['ok', 'ok']
+    json.dumps([public_results(result['analysis']['raw_results']) for result in results])
+
+
+def test_records_serialize_like_dicts_with_json_default():
+    results = extract_code_elements_from_string(PYTHON_CODE, 'python', records=True)
+    assert isinstance(results['functions'][0], Record)
+    plain = extract_code_elements_from_string(PYTHON_CODE, 'python')
+    assert (json.dumps(public_results(results), default=json_default) ==
+            json.dumps(public_results(plain)))
+
+
+def test_find_elements_returns_a_copy():
+    results = extract_code_elements_from_string(PYTHON_CODE, 'python', records=True)
+    found = find_elements(results, 'run')
+    found.clear()
+    assert [element['name'] for element in find_elements(results, 'run')] == ['run']
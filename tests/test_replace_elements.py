@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from pycodelens.analyzer import replace_element, replace_elements
+
+ORIGINAL = '''\
+def first():
+    return 1
+
+
+def second():
+    return 2
+
+
+class Widget:
+    def run(self):
+        return first()
+'''
+
+
+@pytest.fixture
+def module(tmp_path):
+    path = tmp_path / 'module.py'
+    path.write_text(ORIGINAL)
+    return path
+
+
+def test_applies_all_edits_against_the_original_file(module):
+    success, message = replace_elements(str(module), [
+        {'element_type': 'function', 'element_name': 'first', 'replacement_content': 'def first():\n    return 10'},
+        {'element_type': 'class', 'element_name': 'Widget', 'replacement_content': 'class Widget:\n    pass'},
+        {'element_type': 'lines', 'element_name': '5-6', 'replacement_content': 'def second():\n    return 20'},
+    ])
+    assert success, message
+    assert 'applied 3 edit(s)' in message
+    assert module.read_text() == '''\
+def first():
+    return 10
+
+
+def second():
+    return 20
+
+
+class Widget:
+    pass
+'''
+
+
+def test_method_replacement_keeps_indentation(module):
+    success, message = replace_elements(str(module), [
+        {'element_type': 'function', 'element_name': 'Widget.run',
+         'replacement_content': 'def run(self):\n    return second()'},
+    ])
+    assert success, message
+    assert module.read_text().endswith('    def run(self):\n        return second()\n')
+
+
+def test_overlapping_edits_are_rejected(module):
+    success, message = replace_elements(str(module), [
+        {'element_type': 'class', 'element_name': 'Widget', 'replacement_content': 'class Widget:\n    pass'},
+        {'element_type': 'function', 'element_name': 'run', 'replacement_content': 'def run(self):\n    pass'},
+    ])
+    assert not success
+    assert 'overlaps' in message
+    assert module.read_text() == ORIGINAL
+
+
+def test_one_failing_edit_leaves_the_file_untouched(module):
+    success, message = replace_elements(str(module), [
+        {'element_type': 'function', 'element_name': 'first', 'replacement_content': 'def first():\n    return 10'},
+        {'element_type': 'function', 'element_name': 'missing', 'replacement_content': 'def missing():\n    pass'},
+    ])
+    assert not success
+    assert message.startswith('Edit 2')
+    assert module.read_text() == ORIGINAL
+
+
+def test_optional_edits_of_missing_elements_are_skipped(module):
+    success, message = replace_elements(str(module), [
+        {'element_type': 'function', 'element_name': 'first', 'replacement_content': 'def first():\n    return 10'},
+        {'element_type': 'function', 'element_name': 'missing', 'replacement_content': 'def missing():\n    pass',
+         'optional': True},
+    ])
+    assert success, message
+    assert 'applied 1 edit(s)' in message
+    assert 'skipped 1 optional edit(s)' in message
+    assert 'return 10' in module.read_text()
+
+
+def test_failed_write_leaves_the_original_and_no_temporary_file(module, monkeypatch):
+    def failing_replace(source, destination):
+        raise OSError('disk full')
+    monkeypatch.setattr(os, 'replace', failing_replace)
+    success, message = replace_elements(str(module), [
+        {'element_type': 'function', 'element_name': 'first', 'replacement_content': 'def first():\n    return 10'},
+    ])
+    assert not success
+    assert 'disk full' in message
+    assert module.read_text() == ORIGINAL
+    assert os.listdir(module.parent) == ['module.py']
+
+
+def test_writes_through_symlinks_and_keeps_the_mode(module, tmp_path):
+    os.chmod(module, 0o640)
+    link = tmp_path / 'link.py'
+    link.symlink_to(module)
+    success, message = replace_element(str(link), 'function', 'first', replacement_content='def first():\n    pass')
+    assert success, message
+    assert link.is_symlink()
+    assert 'pass' in module.read_text()
+    assert os.stat(module).st_mode & 0o777 == 0o640
@@ -0,0 +1,56 @@
+import multiprocessing
+
+import pytest
+
+from pycodelens import scanner
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='workers must inherit the patched analyzer')
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for number in range(6):
+        (tmp_path / f'module{number}.py').write_text(f'def function{number}():\n    return {number}\n')
+    return tmp_path
+
+
+@pytest.fixture
+def stuck_in_c(monkeypatch):
+    analyze_file = scanner.analyze_file
+
+    def slow_analyze_file(file_path, *args):
+        if file_path.endswith('module2.py'):
+            # One long call into C, which no signal handler can interrupt
+            sum(range(10 ** 12))
+        return analyze_file(file_path, *args)
+    monkeypatch.setattr(scanner, 'analyze_file', slow_analyze_file)
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_timeout_abandons_a_file_stuck_in_c(tree, stuck_in_c, workers):
+    results = {result['file'].rsplit('/', 1)[-1]: result
+               for result in scanner.analyze_tree(str(tree), workers=workers, timeout=0.5)}
+    assert len(results) == 6
+    assert results['module2.py']['status'] == 'timeout'
+    assert results['module2.py']['error'] == 'Timed out after 0.5s'
+    assert all(result['status'] == 'ok' for name, result in results.items() if name != 'module2.py')
+    assert multiprocessing.active_children() == []
+
+
+def test_crashed_worker_is_replaced(tree, monkeypatch):
+    analyze_file = scanner.analyze_file
+
+    def crashing_analyze_file(file_path, *args):
+        if file_path.endswith('module4.py'):
+            import os
+            os._exit(3)
+        return analyze_file(file_path, *args)
+    monkeypatch.setattr(scanner, 'analyze_file', crashing_analyze_file)
+
+    results = {result['file'].rsplit('/', 1)[-1]: result
+               for result in scanner.analyze_tree(str(tree), workers=1, timeout=30)}
+    assert len(results) == 6
+    assert results['module4.py'] == {'file': str(tree / 'module4.py'), 'status': 'error',
+                                     'error': 'Worker process exited with code 3'}
+    assert sum(result['status'] == 'ok' for result in results.values()) == 5